@@ -12,6 +12,7 @@ from app.core.decorators import (
     is_allowed_user
 )
 from app.core.models import User as UserModel
+from app.core.schemas import CardViewedEvent, CooldownHitEvent
 from app.core.variables import variables
 from app.embeds import profile_embeds, info_embeds
 from app.localization import t
@@ -37,24 +38,49 @@ from app.services import (
     interaction_service,
     schrodinger_game_service,
     twenty_one_service,
-    balance_analytics_service
+    balance_analytics_service,
+    balance_archive_service,
+    balance_history_service,
+    rank_service,
+    render_service
 )
 from app.utils.response_utils import response_utils
 from app.utils.time_utils import time_utils
 
-bot = commands.InteractionBot(intents=disnake.Intents.all())
+
+class Bot(commands.InteractionBot):
+    async def close(self) -> None:
+        await economy_logging_service.stop()
+        economy_logging_service.log_stats()
+        await balance_history_service.stop()
+        balance_history_service.log_stats()
+        balance_archive_service.stop()
+        article_service.stop_pregeneration()
+        keycard_service.image_cache.log_stats()
+        article_service.image_cache.log_stats()
+        await render_service.stop()
+        render_service.log_stats()
+        await super().close()
+
+
+bot = Bot(intents=disnake.Intents.all())
 
 
 @bot.event
 async def on_ready():
     try:
+        balance_history_service.start_migrations()
+        balance_archive_service.start()
+        render_service.start()
         await economy_logging_service.init_logging(bot)
         if config.update_scp_objects:
             await scp_objects_service.update_scp_objects()
+            article_service.start_pregeneration()
         if config.sync_shop_cards:
             await shop_service.sync_shop_cards()
         if config.sync_achievements:
             await achievement_service.sync_achievements()
+        await rank_service.build()
     except asyncpg.exceptions.InternalServerError as exception:
         logger.error(exception)
     logger.info(t("logs.logged_in", bot_user=bot.user))
@@ -82,7 +108,7 @@ async def on_slash_command_error(interaction, error):
         timestamp = await time_utils.get_current()
         timestamp = round(timestamp.timestamp() + error.retry_after)
         await response_utils.send_ephemeral_response(interaction, t("errors.cooldown", timestamp=timestamp))
-        asyncio.create_task(achievement_handler_service.handle_cooldown_achievement(interaction.user))
+        asyncio.create_task(achievement_handler_service.handle_event(CooldownHitEvent(interaction.user)))
     else:
         logger.error(error)
 
@@ -132,15 +158,16 @@ async def view_card(
         profile_data = await keycard_service.get_user_profile_data(target)
 
         embed = await profile_embeds.format_user_embed(
-            card=profile_data.card_image,
             color=profile_data.card_template.embed_color,
             dossier=profile_data.dossier,
             role=profile_data.top_role,
             achievements_count=profile_data.achievements_count
         )
 
-        await response_utils.send_response(interaction, embed=embed)
-        asyncio.create_task(achievement_handler_service.handle_view_card_achievements(interaction.user, member))
+        await response_utils.send_image_response(interaction, embed=embed, image=profile_data.card_image)
+        asyncio.create_task(achievement_handler_service.handle_event(
+            CardViewedEvent(interaction.user, is_own_card=interaction.user.id == member.id)
+        ))
 
     except Exception as exception:
         await response_utils.send_error_response(interaction)
@@ -183,8 +210,8 @@ async def get_random_article(
                 interaction, message=t("responses.articles.all_viewed"), delete_after=10
             )
         elif random_article:
-            embed, view = await article_service.create_article_components(random_article)
-            await response_utils.send_response(interaction, embed=embed, view=view)
+            embed, view, image = await article_service.create_article_components(random_article)
+            await response_utils.send_image_response(interaction, embed=embed, image=image, view=view)
         else:
             await response_utils.send_response(
                 interaction, message=t("responses.articles.not_found"), delete_after=10
@@ -1,6 +1,7 @@
 from functools import wraps
 
 from app.config import config
+from app.core.enums import BalanceReason
 from app.core.models import User
 from app.localization import t
 from app.services.economy_management_service import economy_management_service
@@ -61,8 +62,10 @@ def _remove_bet_from_balance(wait_for_response: bool):
                 )
                 return
 
-            reason = t("economy.reasons.game_bet", game_name=interaction.application_command.name)
-            await economy_management_service.update_user_balance(interaction.user, -bet, reason=reason)
+            await economy_management_service.update_user_balance(
+                interaction.user, -bet, BalanceReason.GAME_BET,
+                reason_params={"game_name": interaction.application_command.name}
+            )
 
             await func(interaction, *args, **kwargs)
 
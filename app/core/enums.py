@@ -1,10 +1,43 @@
-from enum import Enum
+from enum import Enum, IntEnum
+from typing import Any, Dict, Optional
+
+from app.localization import t
 
 
 class ItemType(str, Enum):
     CARD = "card"
 
 
+class BalanceReason(IntEnum):
+    UNKNOWN = 0
+    SHOP_ITEM_BUY = 1
+    GAME_BET = 2
+    LEGAL_WORK = 3
+    RISKY_WORK_SUCCESS = 4
+    RISKY_WORK_FAILURE = 5
+    TRANSFER_SENT = 6
+    TRANSFER_RECEIVED = 7
+    GAME_WIN_CANDY = 8
+    GAME_WIN_COIN = 9
+    GAME_WIN_COGUARD = 10
+    GAME_WIN_CRYSTALLIZATION = 11
+    GAME_WIN_SCHRODINGER = 12
+    GAME_WIN_HOLE = 13
+    GAME_WIN_STARING = 14
+    GAME_WIN_TWENTY_ONE = 15
+    GAME_TIE_TWENTY_ONE = 16
+    HOLE_GAME_BET_REFUND = 17
+    STARING_GAME_NOT_ENOUGH_PLAYERS_REFUND = 18
+    STARING_GAME_BET = 19
+
+    @property
+    def locale_key(self) -> str:
+        return f"economy.reasons.{self.name.lower()}"
+
+    def render(self, params: Optional[Dict[str, Any]] = None) -> str:
+        return t(self.locale_key, **(params or {}))
+
+
 class Color(Enum):
     LIGHT_PINK = 0xFFB9BC
     GREEN = 0x4CAF50
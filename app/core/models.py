@@ -1,10 +1,23 @@
+import json
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
 from tortoise import fields
+from tortoise.indexes import Index
 from tortoise.models import Model
 
-from app.core.enums import ItemType
+from app.core.enums import BalanceReason, ItemType
+from app.core.schemas import BalanceRollupEntry, BalanceUpdateResult
 from app.localization import t
 
 
+class CoveringIndex(Index):
+    def __init__(self, *, fields: Tuple[str, ...], include: Tuple[str, ...], name: Optional[str] = None):
+        super().__init__(fields=fields, name=name)
+        self.extra = f" INCLUDE ({', '.join(include)})"
+
+
 class User(Model):
     id = fields.IntField(pk=True)
     user_id = fields.BigIntField(unique=True)
@@ -40,13 +53,72 @@ class User(Model):
         await self.save()
 
     async def update_balance(self, amount: int, balance_only: bool = False):
-        new_balance = self.balance + amount
-        self.balance = max(new_balance, 0)
-
-        if amount > 0 and not balance_only:
-            self.reputation += amount
-
-        await self.save()
+        result = await self.add_balance(self.user_id, amount, balance_only)
+        self.balance = result.balance
+        self.reputation = result.reputation
+
+    @staticmethod
+    def _reputation_delta(amount: int, balance_only: bool) -> int:
+        return amount if amount > 0 and not balance_only else 0
+
+    @classmethod
+    async def add_balance(cls, user_id: int, amount: int, balance_only: bool = False) -> BalanceUpdateResult:
+        rows = await cls._meta.db.execute_query_dict(
+            """
+            INSERT INTO users (user_id, balance, reputation)
+            VALUES ($1::bigint, GREATEST($2::bigint, 0), $3::bigint)
+            ON CONFLICT (user_id) DO UPDATE
+            SET balance = GREATEST(users.balance + $2::bigint, 0),
+                reputation = users.reputation + $3::bigint
+            RETURNING id, user_id, balance, reputation
+            """,
+            [user_id, amount, cls._reputation_delta(amount, balance_only)]
+        )
+        return BalanceUpdateResult(**rows[0])
+
+    @classmethod
+    async def withdraw_balance(cls, user_id: int, amount: int) -> Optional[BalanceUpdateResult]:
+        rows = await cls._meta.db.execute_query_dict(
+            """
+            UPDATE users
+            SET balance = balance - $2::bigint
+            WHERE user_id = $1::bigint AND balance >= $2::bigint
+            RETURNING id, user_id, balance, reputation
+            """,
+            [user_id, amount]
+        )
+        return BalanceUpdateResult(**rows[0]) if rows else None
+
+    @classmethod
+    async def add_balances(
+            cls, changes: Dict[int, int], balance_only: bool = False
+    ) -> Dict[int, BalanceUpdateResult]:
+        if not changes:
+            return {}
+
+        user_ids: List[int] = list(changes.keys())
+        rows = await cls._meta.db.execute_query_dict(
+            """
+            UPDATE users
+            SET balance = GREATEST(users.balance + changes.amount, 0),
+                reputation = users.reputation + changes.reputation
+            FROM unnest($1::bigint[], $2::bigint[], $3::bigint[]) AS changes(user_id, amount, reputation)
+            WHERE users.user_id = changes.user_id
+            RETURNING users.id, users.user_id, users.balance, users.reputation
+            """,
+            [
+                user_ids,
+                [changes[user_id] for user_id in user_ids],
+                [cls._reputation_delta(changes[user_id], balance_only) for user_id in user_ids],
+            ]
+        )
+        results = {row["user_id"]: BalanceUpdateResult(**row) for row in rows}
+
+        for user_id in user_ids:
+            if user_id not in results:
+                results[user_id] = await cls.add_balance(user_id, changes[user_id], balance_only)
+
+        return results
 
 
 class Item(Model):
@@ -144,12 +216,429 @@ class BalanceHistory(Model):
     timestamp = fields.DatetimeField(auto_now_add=True, indexed=True)
     change_amount = fields.BigIntField()
     new_balance = fields.BigIntField()
-    reason = fields.TextField()
+    reason = fields.IntEnumField(BalanceReason)
+    reason_params = fields.JSONField(null=True)
+
+    legacy_index_name = "idx_balance_his_user_id_e5d2b2"
 
     class Meta:
         table = "balance_history"
         ordering = ["-timestamp"]
-        indexes = (("user", "timestamp"),)
+        indexes = (
+            CoveringIndex(
+                fields=("user_id", "timestamp"),
+                include=("change_amount", "reason", "reason_params"),
+                name="idx_balance_history_user_timestamp_covering"
+            ),
+        )
 
     def __str__(self):
         return f"User {self.user_id} balance changed by {self.change_amount} at {self.timestamp}"
+
+    def get_reason_text(self) -> str:
+        return self.reason.render(self.reason_params)
+
+    @classmethod
+    async def get_last_inserted_id(cls, using_db=None) -> int:
+        db = using_db or cls._meta.db
+        rows = await db.execute_query_dict(
+            "SELECT currval(pg_get_serial_sequence($1, 'id')) AS id", [cls._meta.db_table]
+        )
+        return rows[0]["id"]
+
+    @classmethod
+    async def get_period_stats(
+            cls, user_pk: int, start_date: datetime, excluded_reasons: Tuple[BalanceReason, ...]
+    ) -> Dict:
+        rows = await cls._meta.db.execute_query_dict(
+            f"""
+            WITH period AS (
+                SELECT change_amount, reason, reason_params, "timestamp"
+                FROM {cls._meta.db_table}
+                WHERE user_id = $1 AND "timestamp" >= $2 AND change_amount <> 0
+                    AND reason <> ALL($3::smallint[])
+            ),
+            extremes AS (
+                SELECT DISTINCT ON (change_amount > 0) change_amount, reason, reason_params
+                FROM period
+                ORDER BY change_amount > 0, abs(change_amount) DESC, "timestamp"
+            )
+            SELECT
+                totals.total_earned,
+                totals.total_lost,
+                gain.reason AS biggest_gain_reason,
+                gain.reason_params AS biggest_gain_reason_params,
+                COALESCE(gain.change_amount, 0) AS biggest_gain_amount,
+                loss.reason AS biggest_loss_reason,
+                loss.reason_params AS biggest_loss_reason_params,
+                COALESCE(-loss.change_amount, 0) AS biggest_loss_amount
+            FROM (
+                SELECT
+                    COALESCE(SUM(change_amount) FILTER (WHERE change_amount > 0), 0) AS total_earned,
+                    COALESCE(-SUM(change_amount) FILTER (WHERE change_amount < 0), 0) AS total_lost
+                FROM period
+            ) AS totals
+            LEFT JOIN extremes AS gain ON gain.change_amount > 0
+            LEFT JOIN extremes AS loss ON loss.change_amount < 0
+            """,
+            [user_pk, start_date, [reason.value for reason in excluded_reasons]]
+        )
+        stats = dict(rows[0])
+        for key in ("biggest_gain", "biggest_loss"):
+            if stats[f"{key}_reason"] is not None:
+                stats[f"{key}_reason"] = BalanceReason(stats[f"{key}_reason"])
+            if stats[f"{key}_reason_params"] is not None:
+                stats[f"{key}_reason_params"] = json.loads(stats[f"{key}_reason_params"])
+        return stats
+
+    @staticmethod
+    def get_partition_start(timestamp: datetime, months: int = 0) -> datetime:
+        timestamp = timestamp.astimezone(timezone.utc)
+        month_index = timestamp.year * 12 + timestamp.month - 1 + months
+        return datetime(month_index // 12, month_index % 12 + 1, 1, tzinfo=timezone.utc)
+
+    @classmethod
+    def get_partition_name(cls, partition_start: datetime) -> str:
+        return f"{cls._meta.db_table}_p{partition_start:%Y_%m}"
+
+    @classmethod
+    async def is_partitioned(cls) -> bool:
+        rows = await cls._meta.db.execute_query_dict(
+            "SELECT relkind::text FROM pg_class WHERE oid = to_regclass($1)", [cls._meta.db_table]
+        )
+        return bool(rows) and rows[0]["relkind"] == "p"
+
+    @classmethod
+    async def prepare_partitioning(cls, boundary: datetime) -> None:
+        db = cls._meta.db
+        table = cls._meta.db_table
+        for index in cls._meta.indexes:
+            await db.execute_script(index.get_sql(db.schema_generator(db), cls, safe=True))
+        await db.execute_script(f'CREATE UNIQUE INDEX IF NOT EXISTS {table}_id_timestamp_key ON {table} (id, "timestamp")')
+        await db.execute_script(
+            f"""
+            ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_partition_bound;
+            ALTER TABLE {table} ADD CONSTRAINT {table}_partition_bound
+                CHECK ("timestamp" IS NOT NULL AND "timestamp" < '{boundary.isoformat()}') NOT VALID;
+            """
+        )
+        await db.execute_script(f"ALTER TABLE {table} VALIDATE CONSTRAINT {table}_partition_bound")
+
+    @classmethod
+    async def convert_to_partitioned(cls, boundary: datetime) -> None:
+        db = cls._meta.db
+        table = cls._meta.db_table
+        legacy_partition = f"{table}_before_{boundary:%Y_%m}"
+        index_sqls = "\n".join(
+            index.get_sql(db.schema_generator(db), cls, safe=False) for index in cls._meta.indexes
+        )
+        legacy_index_renames = "\n".join(
+            f'ALTER INDEX IF EXISTS "{index.name}" RENAME TO "{index.name}_legacy";'
+            for index in cls._meta.indexes
+        )
+        await db.execute_script(
+            f"""
+            ALTER TABLE {table} RENAME TO {legacy_partition};
+            ALTER TABLE {legacy_partition} DROP CONSTRAINT {table}_pkey;
+            DROP INDEX IF EXISTS "{cls.legacy_index_name}";
+            {legacy_index_renames}
+            CREATE TABLE {table} (LIKE {legacy_partition} INCLUDING DEFAULTS) PARTITION BY RANGE ("timestamp");
+            ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id;
+            ALTER TABLE {legacy_partition} ADD CONSTRAINT {legacy_partition}_pkey PRIMARY KEY USING INDEX {table}_id_timestamp_key;
+            ALTER TABLE {table}
+                ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, "timestamp"),
+                ADD CONSTRAINT {table}_user_id_fkey FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE;
+            {index_sqls}
+            ALTER TABLE {table} ATTACH PARTITION {legacy_partition} FOR VALUES FROM (MINVALUE) TO ('{boundary.isoformat()}');
+            ALTER TABLE {legacy_partition} DROP CONSTRAINT IF EXISTS {table}_partition_bound;
+            CREATE TABLE {table}_default PARTITION OF {table} DEFAULT;
+            """
+        )
+
+    @classmethod
+    async def create_partition(cls, partition_start: datetime) -> str:
+        name = cls.get_partition_name(partition_start)
+        await cls._meta.db.execute_script(
+            f"""
+            CREATE TABLE IF NOT EXISTS {name} PARTITION OF {cls._meta.db_table}
+            FOR VALUES FROM ('{partition_start.isoformat()}') TO ('{cls.get_partition_start(partition_start, 1).isoformat()}')
+            """
+        )
+        return name
+
+    @classmethod
+    async def get_partitions(cls) -> List[Tuple[str, Optional[datetime], datetime]]:
+        rows = await cls._meta.db.execute_query_dict(
+            """
+            SELECT child.relname AS name FROM pg_inherits
+            JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass($1)
+            """,
+            [cls._meta.db_table]
+        )
+        pattern = re.compile(rf"{cls._meta.db_table}_(p|before_)(\d{{4}})_(\d{{2}})")
+        partitions = []
+        for row in rows:
+            match = pattern.fullmatch(row["name"])
+            if not match:
+                continue
+            month_start = datetime(int(match.group(2)), int(match.group(3)), 1, tzinfo=timezone.utc)
+            if match.group(1) == "p":
+                partitions.append((row["name"], month_start, cls.get_partition_start(month_start, 1)))
+            else:
+                partitions.append((row["name"], None, month_start))
+        return sorted(partitions, key=lambda partition: partition[2])
+
+    @classmethod
+    async def get_partition_rows(cls, partition: str, after_id: int, limit: int) -> List[Dict]:
+        return await cls._meta.db.execute_query_dict(
+            f"""
+            SELECT
+                id, user_id, (extract(epoch FROM "timestamp") * 1000000)::bigint AS "timestamp",
+                change_amount, new_balance, reason, COALESCE(reason_params::text, '') AS reason_params
+            FROM {partition}
+            WHERE id > $1
+            ORDER BY id
+            LIMIT $2
+            """,
+            [after_id, limit]
+        )
+
+    @classmethod
+    async def drop_partition(cls, partition: str) -> None:
+        await cls._meta.db.execute_script(
+            f"""
+            ALTER TABLE {cls._meta.db_table} DETACH PARTITION {partition};
+            DROP TABLE {partition};
+            """
+        )
+
+    @classmethod
+    async def prepare_reason_migration(cls) -> bool:
+        db = cls._meta.db
+        rows = await db.execute_query_dict(
+            """
+            SELECT column_name, data_type FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = $1
+                AND column_name IN ('reason', 'legacy_reason')
+            """,
+            [cls._meta.db_table]
+        )
+        columns = {row["column_name"]: row["data_type"] for row in rows}
+        if columns.get("reason") == "text":
+            await db.execute_script(
+                f"""
+                ALTER TABLE {cls._meta.db_table} RENAME COLUMN reason TO legacy_reason;
+                ALTER TABLE {cls._meta.db_table}
+                    ALTER COLUMN legacy_reason DROP NOT NULL,
+                    ADD COLUMN reason SMALLINT NOT NULL DEFAULT {BalanceReason.UNKNOWN.value},
+                    ADD COLUMN reason_params JSONB;
+                """
+            )
+            return True
+        return "legacy_reason" in columns
+
+    @classmethod
+    async def get_legacy_reasons(cls, after_id: int, limit: int) -> List[Dict]:
+        return await cls._meta.db.execute_query_dict(
+            f"""
+            SELECT id, legacy_reason FROM {cls._meta.db_table}
+            WHERE id > $1 AND legacy_reason IS NOT NULL
+            ORDER BY id
+            LIMIT $2
+            """,
+            [after_id, limit]
+        )
+
+    @classmethod
+    async def convert_legacy_reasons(
+            cls, ids: List[int], reasons: List[BalanceReason], reason_params: List[Optional[Dict[str, Any]]]
+    ) -> None:
+        await cls._meta.db.execute_query(
+            f"""
+            UPDATE {cls._meta.db_table} AS history
+            SET reason = converted.reason, reason_params = converted.reason_params::jsonb, legacy_reason = NULL
+            FROM unnest($1::bigint[], $2::smallint[], $3::text[]) AS converted(id, reason, reason_params)
+            WHERE history.id = converted.id
+            """,
+            [
+                ids,
+                [reason.value for reason in reasons],
+                [json.dumps(params, ensure_ascii=False) if params else None for params in reason_params],
+            ]
+        )
+
+    @classmethod
+    async def finish_reason_migration(cls) -> None:
+        db = cls._meta.db
+        await db.execute_script(
+            f"ALTER TABLE {cls._meta.db_table} DROP COLUMN legacy_reason, ALTER COLUMN reason DROP DEFAULT"
+        )
+        for index in cls._meta.indexes:
+            await db.execute_script(index.get_sql(db.schema_generator(db), cls, safe=True))
+        await db.execute_script(f'DROP INDEX IF EXISTS "{cls.legacy_index_name}"')
+
+
+class BalanceRollup(Model):
+    id = fields.BigIntField(pk=True)
+    bucket_start = fields.DatetimeField()
+    open_balance = fields.BigIntField()
+    close_balance = fields.BigIntField()
+    min_balance = fields.BigIntField()
+    max_balance = fields.BigIntField()
+    gained = fields.BigIntField(default=0)
+    lost = fields.BigIntField(default=0)
+    first_change_at = fields.DatetimeField()
+    last_change_at = fields.DatetimeField()
+
+    granularity: str
+    bucket_duration: timedelta
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def get_bucket_start(cls, timestamp: datetime) -> datetime:
+        bucket_start = timestamp.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        if cls.granularity == "day":
+            bucket_start = bucket_start.replace(hour=0)
+        return bucket_start
+
+    @classmethod
+    def _merge_sql(cls) -> str:
+        table = cls._meta.db_table
+        return f"""
+            ON CONFLICT (user_id, bucket_start) DO UPDATE
+            SET open_balance = CASE WHEN EXCLUDED.first_change_at < {table}.first_change_at
+                    THEN EXCLUDED.open_balance ELSE {table}.open_balance END,
+                close_balance = CASE WHEN EXCLUDED.last_change_at >= {table}.last_change_at
+                    THEN EXCLUDED.close_balance ELSE {table}.close_balance END,
+                min_balance = LEAST({table}.min_balance, EXCLUDED.min_balance),
+                max_balance = GREATEST({table}.max_balance, EXCLUDED.max_balance),
+                gained = {table}.gained + EXCLUDED.gained,
+                lost = {table}.lost + EXCLUDED.lost,
+                first_change_at = LEAST({table}.first_change_at, EXCLUDED.first_change_at),
+                last_change_at = GREATEST({table}.last_change_at, EXCLUDED.last_change_at)
+            """
+
+    @classmethod
+    async def apply_entries(cls, entries: List[BalanceRollupEntry], using_db=None) -> None:
+        if not entries:
+            return
+
+        db = using_db or cls._meta.db
+        await db.execute_query(
+            f"""
+            INSERT INTO {cls._meta.db_table} (
+                user_id, bucket_start, open_balance, close_balance, min_balance, max_balance,
+                gained, lost, first_change_at, last_change_at
+            )
+            SELECT * FROM unnest(
+                $1::int[], $2::timestamptz[], $3::bigint[], $4::bigint[], $5::bigint[], $6::bigint[],
+                $7::bigint[], $8::bigint[], $9::timestamptz[], $10::timestamptz[]
+            )
+            {cls._merge_sql()}
+            """,
+            [
+                [entry.user_pk for entry in entries],
+                [entry.bucket_start for entry in entries],
+                [entry.open_balance for entry in entries],
+                [entry.close_balance for entry in entries],
+                [entry.min_balance for entry in entries],
+                [entry.max_balance for entry in entries],
+                [entry.gained for entry in entries],
+                [entry.lost for entry in entries],
+                [entry.first_change_at for entry in entries],
+                [entry.last_change_at for entry in entries],
+            ]
+        )
+
+    @classmethod
+    async def backfill(
+            cls, max_history_id: int, first_user_pk: int, last_user_pk: int,
+            transfer_reasons: Tuple[BalanceReason, ...], using_db=None
+    ) -> int:
+        db = using_db or cls._meta.db
+        rows = await db.execute_query_dict(
+            f"""
+            WITH inserted AS (
+                INSERT INTO {cls._meta.db_table} (
+                    user_id, bucket_start, open_balance, close_balance, min_balance, max_balance,
+                    gained, lost, first_change_at, last_change_at
+                )
+                SELECT
+                    user_id,
+                    bucket_start,
+                    (array_agg(new_balance ORDER BY "timestamp", id))[1],
+                    (array_agg(new_balance ORDER BY "timestamp" DESC, id DESC))[1],
+                    MIN(new_balance),
+                    MAX(new_balance),
+                    COALESCE(SUM(change_amount) FILTER (WHERE change_amount > 0 AND NOT is_transfer), 0),
+                    COALESCE(-SUM(change_amount) FILTER (WHERE change_amount < 0 AND NOT is_transfer), 0),
+                    MIN("timestamp"),
+                    MAX("timestamp")
+                FROM (
+                    SELECT
+                        user_id, "timestamp", id, new_balance, change_amount,
+                        date_trunc($1, "timestamp" AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS bucket_start,
+                        reason = ANY($2::smallint[]) AS is_transfer
+                    FROM {BalanceHistory._meta.db_table}
+                    WHERE id <= $3 AND user_id BETWEEN $4 AND $5
+                ) AS history
+                GROUP BY user_id, bucket_start
+                {cls._merge_sql()}
+                RETURNING 1
+            )
+            SELECT COUNT(*) AS count FROM inserted
+            """,
+            [cls.granularity, [reason.value for reason in transfer_reasons], max_history_id, first_user_pk, last_user_pk]
+        )
+        return rows[0]["count"]
+
+
+class BalanceRollupHourly(BalanceRollup):
+    user = fields.ForeignKeyField("models.User", related_name="hourly_balance_rollups")
+
+    granularity = "hour"
+    bucket_duration = timedelta(hours=1)
+
+    class Meta:
+        table = "balance_rollups_hourly"
+        unique_together = ("user", "bucket_start")
+
+
+class BalanceRollupDaily(BalanceRollup):
+    user = fields.ForeignKeyField("models.User", related_name="daily_balance_rollups")
+
+    granularity = "day"
+    bucket_duration = timedelta(days=1)
+
+    class Meta:
+        table = "balance_rollups_daily"
+        unique_together = ("user", "bucket_start")
+
+
+class Counter(Model):
+    id = fields.IntField(pk=True)
+    name = fields.CharField(max_length=50, unique=True)
+    value = fields.BigIntField(default=0)
+
+    class Meta:
+        table = "counters"
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+    @classmethod
+    async def allocate(cls, name: str, size: int) -> int:
+        rows = await cls._meta.db.execute_query_dict(
+            """
+            INSERT INTO counters (name, value)
+            VALUES ($1, $2::bigint)
+            ON CONFLICT (name) DO UPDATE
+            SET value = counters.value + $2::bigint
+            RETURNING value
+            """,
+            [name, size]
+        )
+        return rows[0]["value"]
@@ -1,8 +1,12 @@
 from dataclasses import dataclass, field
-from typing import Tuple, List, Literal, Optional
+from datetime import datetime
+from io import BytesIO
+from typing import Any, ClassVar, Dict, Tuple, List, Literal, Optional, Set
 
 from PIL import Image
-from disnake import Member, Message, User, File, Role
+from disnake import Asset, Member, Message, User, File, Role, Embed
+
+from app.core.enums import BalanceReason
 
 
 @dataclass
@@ -21,15 +25,43 @@ class CardConfig:
     risky_work_penalty_multiplier: float
 
 
+@dataclass
+class AttachmentImage:
+    key: str
+    filename: str
+    data: bytes
+    url: Optional[str] = None
+
+    def to_file(self) -> File:
+        return File(fp=BytesIO(self.data), filename=self.filename)
+
+
 @dataclass
 class UserProfileData:
-    card_image: File
+    card_image: AttachmentImage
     card_template: CardConfig
     dossier: Optional[str]
     top_role: Optional[Role]
     achievements_count: int
 
 
+@dataclass
+class KeyCardMetadata:
+    user_id: int
+    user_name: str
+    user_code: str
+    avatar: Asset
+    avatar_decoration: Optional[Asset] = None
+
+    @property
+    def avatar_key(self) -> str:
+        return self.avatar.key
+
+    @property
+    def avatar_decoration_key(self) -> Optional[str]:
+        return self.avatar_decoration.key if self.avatar_decoration else None
+
+
 @dataclass
 class NonLegalPrompts:
     success: List[str]
@@ -42,11 +74,97 @@ class WorkPrompts:
     non_legal: NonLegalPrompts
 
 
+@dataclass
+class AchievementCondition:
+    field: str
+    operator: Literal["==", "!=", ">", ">=", "<", "<="]
+    value: Any
+
+
+@dataclass
+class AchievementRule:
+    event: str
+    conditions: List[AchievementCondition]
+
+
 @dataclass
 class AchievementConfig:
     name: str
     description: str
     icon: str
+    rules: List[AchievementRule] = field(default_factory=list)
+
+
+@dataclass
+class AchievementEvent:
+    user: User | Member
+    event_type: ClassVar[str] = ""
+
+
+@dataclass
+class CooldownHitEvent(AchievementEvent):
+    event_type: ClassVar[str] = "cooldown_hit"
+
+
+@dataclass
+class CardViewedEvent(AchievementEvent):
+    is_own_card: bool = True
+    event_type: ClassVar[str] = "card_viewed"
+
+
+@dataclass
+class DossierUpdatedEvent(AchievementEvent):
+    event_type: ClassVar[str] = "dossier_updated"
+
+
+@dataclass
+class ArticleViewedEvent(AchievementEvent):
+    object_class: Optional[str] = None
+    is_new_view: bool = False
+    event_type: ClassVar[str] = "article_viewed"
+
+
+@dataclass
+class WorkFinishedEvent(AchievementEvent):
+    is_risky: bool = False
+    is_success: bool = True
+    event_type: ClassVar[str] = "work_finished"
+
+
+@dataclass
+class BalanceChangedEvent(AchievementEvent):
+    balance: int = 0
+    reputation: int = 0
+    amount_transferred: int = 0
+    event_type: ClassVar[str] = "balance_changed"
+
+
+@dataclass
+class ItemBoughtEvent(AchievementEvent):
+    item_id: str = ""
+    event_type: ClassVar[str] = "item_bought"
+
+
+@dataclass
+class GameFinishedEvent(AchievementEvent):
+    game: str = ""
+    is_loss: bool = False
+    winnings: int = 0
+    multiplier: float = 0.0
+    win_streak: int = 0
+    player_taken: int = 0
+    is_jackpot: bool = False
+    is_o5_win: bool = False
+    is_host: bool = False
+    is_survivor: bool = False
+    is_first_death: bool = False
+    event_type: ClassVar[str] = "game_finished"
+
+
+@dataclass
+class UserAchievementCounters:
+    viewed_articles: int = 0
+    card_ids: Set[str] = field(default_factory=set)
 
 
 @dataclass
@@ -129,3 +247,159 @@ class BalanceAnalyticsData:
     biggest_gain_amount: int
     biggest_loss_reason: str
     biggest_loss_amount: int
+
+
+@dataclass
+class BalanceReport:
+    stats: BalanceAnalyticsData
+    image: bytes
+
+
+@dataclass
+class BalanceHistoryEntry:
+    user_id: int
+    change_amount: int
+    new_balance: int
+    reason: BalanceReason
+    reason_params: Optional[Dict[str, Any]]
+    timestamp: datetime
+
+
+@dataclass
+class BalanceRollupEntry:
+    user_pk: int
+    bucket_start: datetime
+    open_balance: int
+    close_balance: int
+    min_balance: int
+    max_balance: int
+    gained: int
+    lost: int
+    first_change_at: datetime
+    last_change_at: datetime
+
+
+@dataclass
+class BalanceHistoryWriterStats:
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    backpressure_waits: int = 0
+    flushes: int = 0
+    flushed_rows: int = 0
+    failed_rows: int = 0
+    last_flush_latency: float = 0.0
+    max_flush_latency: float = 0.0
+    total_flush_latency: float = 0.0
+
+    @property
+    def average_flush_latency(self) -> float:
+        return self.total_flush_latency / self.flushes if self.flushes else 0.0
+
+
+@dataclass
+class BalanceUpdateResult:
+    id: int
+    user_id: int
+    balance: int
+    reputation: int
+
+
+@dataclass
+class EconomyLogEntry:
+    embed: Embed
+    enqueued_at: float
+
+
+@dataclass
+class EconomyLogSenderStats:
+    queue_depth: int = 0
+    dropped_embeds: int = 0
+    rate_limited: int = 0
+    sent_messages: int = 0
+    sent_embeds: int = 0
+    send_interval: float = 0.0
+    last_send_lag: float = 0.0
+    max_send_lag: float = 0.0
+
+
+@dataclass
+class PageRequest:
+    page: int = 1
+    offset: int = 0
+    action: Literal["first", "previous", "next", "last"] = "first"
+    cursor: Optional[str] = None
+    last_page_size: Optional[int] = None
+
+
+@dataclass
+class PaginationState:
+    criteria: str
+    action: Literal["first", "previous", "current", "next", "last"] = "first"
+    page: int = 1
+    total_count: Optional[int] = None
+    cursor: Optional[str] = None
+    target_user_id: Optional[int] = None
+
+
+@dataclass
+class KeysetPage:
+    items: List[Any]
+    has_previous: bool
+    has_next: bool
+    previous_cursor: Optional[str] = None
+    next_cursor: Optional[str] = None
+
+
+@dataclass
+class ImageCacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    memory_entries: int = 0
+    memory_bytes: int = 0
+    disk_entries: int = 0
+    disk_bytes: int = 0
+    disk_errors: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+
+@dataclass
+class KeyCardRenderJob:
+    template_id: str
+    user_name: str
+    user_code: str
+    avatar: bytes
+    avatar_key: Optional[str] = None
+    avatar_decoration: Optional[bytes] = None
+
+
+@dataclass
+class ArticleRenderJob:
+    number: str
+    title: str
+
+
+@dataclass
+class CardStripRenderJob:
+    filenames: List[str]
+
+
+@dataclass
+class RenderServiceStats:
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    completed: int = 0
+    failed: int = 0
+    timed_out: int = 0
+    rejected: int = 0
+    total_render_time: float = 0.0
+    max_render_time: float = 0.0
+
+    @property
+    def average_render_time(self) -> float:
+        return self.total_render_time / self.completed if self.completed else 0.0
+
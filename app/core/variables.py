@@ -51,6 +51,69 @@ class Variables:
         self.non_legal_work_reward_range: Tuple[int, int] = (250, 500)
         self.non_legal_work_penalty_range: Tuple[int, int] = (200, 400)
 
+        # Balance history writer
+        self.balance_history_queue_size: int = 5000
+        self.balance_history_batch_size: int = 500
+        self.balance_history_flush_interval: float = 2.0
+        self.balance_history_drain_timeout: float = 30.0
+        self.balance_rollup_backfill_chunk_size: int = 500
+        self.balance_history_reason_migration_chunk_size: int = 5000
+        self.balance_history_watermark_cache_size: int = 10000
+
+        # Balance history partitions and cold archive
+        self.balance_history_partitions_ahead: int = 3
+        self.balance_history_retention_months: int = 12
+        self.balance_history_maintenance_interval: float = 6 * 60 * 60
+        self.balance_archive_chunk_size: int = 50000
+        self.balance_archive_dir_path: str = os.path.join(self.project_root, "archive", "balance_history")
+
+        # Economy log channel sender
+        self.economy_log_queue_size: int = 1000
+        self.economy_log_embeds_per_message: int = 10
+        self.economy_log_coalesce_window: float = 1.5
+        self.economy_log_min_send_interval: float = 1.0
+        self.economy_log_max_send_interval: float = 30.0
+        self.economy_log_send_interval_decay: float = 0.8
+        self.economy_log_send_attempts: int = 3
+        self.economy_log_drain_timeout: float = 15.0
+        self.economy_log_counter_name: str = "economy_log"
+        self.economy_log_counter_block_size: int = 100
+
+        # Image render service
+        self.render_workers: int = min(4, os.cpu_count() or 1)
+        self.render_queue_size: int = 64
+        self.render_job_timeout: float = 20.0
+
+        # Keycard image cache
+        self.keycard_cache_dir_path: str = os.path.join(self.project_root, ".cache", "keycards")
+        self.keycard_cache_memory_budget: int = 64 * 1024 * 1024
+        self.keycard_cache_disk_budget: int = 512 * 1024 * 1024
+        self.keycard_render_version: int = 2
+        self.avatar_cache_memory_budget: int = 32 * 1024 * 1024
+        self.decoded_avatar_cache_size: int = 64
+
+        # Article title image cache
+        self.article_cache_dir_path: str = os.path.join(self.project_root, ".cache", "articles")
+        self.article_cache_memory_budget: int = 32 * 1024 * 1024
+        self.article_cache_disk_budget: int = 4 * 1024 * 1024 * 1024
+        self.article_render_version: int = 1
+        self.article_pregenerate_concurrency: int = 2
+
+        # Attachment URL registry
+        self.attachment_registry_size: int = 10000
+        self.attachment_url_expiry_margin: int = 10 * 60
+        self.attachment_url_default_ttl: int = 12 * 60 * 60
+
+        # Balance report cache
+        self.balance_report_cache_budget: int = 16 * 1024 * 1024
+        self.balance_report_cache_bucket_seconds: int = 5 * 60
+
+        # Twenty-one card strip cache
+        self.card_strip_cache_budget: int = 32 * 1024 * 1024
+
+        # Achievement cache
+        self.achievement_cache_size: int = 10000
+
         # Mini-games
         self.crystallize_initial_chance: float = 0.05
         self.crystallize_initial_multiplier_range: Tuple[float, float] = (0.85, 0.99)
@@ -1,7 +1,7 @@
 import asyncio
 from typing import List, Tuple
 
-from disnake import Embed, File, User, Member, Guild
+from disnake import Embed, User, Member, Guild
 from disnake.ext.commands import InteractionBot
 
 from app.core.enums import Color
@@ -61,11 +61,9 @@ async def format_leaderboard_embed(
     return embed
 
 
-async def format_article_embed(article: SCPObject, image_file: File) -> Embed:
+async def format_article_embed(article: SCPObject) -> Embed:
     embed_color = int(variables.scp_class_config[article.object_class][0].lstrip("#"), 16)
-    embed = Embed(color=embed_color)
-    embed.set_image(file=image_file)
-    return embed
+    return Embed(color=embed_color)
 
 
 async def format_achievements_embed(
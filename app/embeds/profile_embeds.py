@@ -1,22 +1,23 @@
 from typing import Optional
 
-from disnake import Embed, File, Role
+from disnake import Embed, Role
 
+from app.core.schemas import AttachmentImage
 from app.core.variables import variables
 from app.localization import t
+from app.utils.attachment_utils import attachment_registry
 
 
-async def format_new_user_embed(user_mention: str, card: File, color: int) -> Embed:
+async def format_new_user_embed(user_mention: str, card: AttachmentImage, color: int) -> Embed:
     embed = Embed(
         description=t("ui.new_user_welcome", user_mention=user_mention),
         color=color
     )
-    embed.set_image(file=card)
+    attachment_registry.set_embed_image(embed, card)
     return embed
 
 
 async def format_user_embed(
-        card: File,
         color: int,
         achievements_count: int,
         dossier: Optional[str] = None,
@@ -26,7 +27,6 @@ async def format_user_embed(
         title=t("ui.user_card.title"),
         color=color
     )
-    embed.set_image(file=card)
 
     if role:
         embed.add_field(name=t("ui.user_card.role_field"), value=role.mention, inline=False)
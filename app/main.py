@@ -1,11 +1,11 @@
 import asyncio
 
-from tortoise import Tortoise
+if __name__ == "__main__":
+    from tortoise import Tortoise
 
-from app.bot import bot
-from app.config import logger, config, tortoise_orm
+    from app.bot import bot
+    from app.config import logger, config, tortoise_orm
 
-if __name__ == "__main__":
     try:
         logger.info("Starting bot...")
         asyncio.run(Tortoise.init(tortoise_orm))
@@ -3,6 +3,7 @@ import asyncio
 from disnake import ui, User, TextInputStyle, ModalInteraction
 
 from app.core.models import User as UserModel
+from app.core.schemas import DossierUpdatedEvent
 from app.localization import t
 from app.services import achievement_handler_service
 from app.utils.response_utils import response_utils
@@ -40,8 +41,8 @@ class DossierModal(ui.Modal):
         new_dossier = interaction.text_values.get("dossier")
 
         self.db_user.dossier = new_dossier
-        await self.db_user.save()
+        await self.db_user.save(update_fields=["dossier"])
 
         await response_utils.send_ephemeral_response(interaction, t("responses.dossier_updated"))
 
-        asyncio.create_task(achievement_handler_service.handle_dossier_achievements(interaction.user))
+        asyncio.create_task(achievement_handler_service.handle_event(DossierUpdatedEvent(interaction.user)))
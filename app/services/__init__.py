@@ -1,6 +1,10 @@
+from .rank_service import rank_service
+from .render_service import render_service
 from .achievement_handler_service import achievement_handler_service
 from .achievement_service import achievement_service
 from .articles_service import article_service
+from .balance_history_service import balance_history_service
+from .balance_archive_service import balance_archive_service
 from .balance_analytics_service import balance_analytics_service
 from .economy_logging_service import economy_logging_service
 from .economy_management_service import economy_management_service
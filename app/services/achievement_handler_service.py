@@ -1,225 +1,207 @@
-from typing import Set
+import operator
+from dataclasses import fields
+from typing import Any, Callable, Dict, List, Set, Tuple
 
-from disnake import User
-from tortoise.exceptions import DoesNotExist
+from cachetools import LRUCache
+from disnake import User, Member
 
 from app.config import logger
 from app.core.enums import ItemType
 from app.core.models import (
     User as UserModel,
-    SCPObject,
     Achievement,
-    Item,
     UserAchievement,
-    UserItem
+    UserItem,
+    ViewedScpObject
 )
-from app.core.schemas import CrystallizationState, CoguardState
+from app.core.schemas import (
+    AchievementEvent,
+    AchievementRule,
+    ArticleViewedEvent,
+    ItemBoughtEvent,
+    UserAchievementCounters
+)
+from app.core.variables import variables
+from app.services import rank_service
 from app.utils.response_utils import response_utils
 
 
 class AchievementHandlerService:
-    @staticmethod
-    async def _grant_achievement(user: User, achievement_id: str) -> None:
+    operators: Dict[str, Callable[[Any, Any], bool]] = {
+        "==": operator.eq,
+        "!=": operator.ne,
+        ">": operator.gt,
+        ">=": operator.ge,
+        "<": operator.lt,
+        "<=": operator.le,
+    }
+    counter_fields = ("viewed_articles", "card_count", "missing_purchasable_cards")
+
+    def __init__(self):
+        self.achievements: Dict[str, Achievement] = {}
+        self.rules: Dict[str, List[Tuple[str, AchievementRule]]] = {}
+        self.counter_events: Set[str] = set()
+        self.purchasable_card_ids: Set[str] = set()
+        self._user_achievements: LRUCache[int, int] = LRUCache(maxsize=variables.achievement_cache_size)
+        self._user_counters: LRUCache[int, UserAchievementCounters] = LRUCache(
+            maxsize=variables.achievement_cache_size
+        )
+        self.load_rules()
+
+    def load_rules(self) -> None:
+        self.rules = {}
+        self.counter_events = set()
+        for achievement_id, config in variables.achievements.items():
+            for rule in config.rules:
+                unknown_operators = {
+                    condition.operator for condition in rule.conditions
+                    if condition.operator not in self.operators
+                }
+                if unknown_operators:
+                    logger.error(
+                        f"Skipping rule '{rule.event}' of achievement '{achievement_id}': "
+                        f"unknown operators {unknown_operators}"
+                    )
+                    continue
+
+                self.rules.setdefault(rule.event, []).append((achievement_id, rule))
+                if any(condition.field in self.counter_fields for condition in rule.conditions):
+                    self.counter_events.add(rule.event)
+
+        self.purchasable_card_ids = {
+            card_id for card_id, card in variables.cards.items() if card.price > 0
+        }
+
+    async def load_achievements(self) -> None:
+        self.achievements = {ach.achievement_id: ach async for ach in Achievement.all()}
+        self._user_achievements.clear()
+
+    async def _get_user_achievements_mask(self, user_id: int) -> int:
+        mask = self._user_achievements.get(user_id)
+        if mask is None:
+            mask = 0
+            for achievement_pk in await UserAchievement.filter(
+                    user__user_id=user_id
+            ).values_list("achievement_id", flat=True):
+                mask |= 1 << achievement_pk
+            self._user_achievements[user_id] = mask
+        return mask
+
+    def _mark_granted(self, user_id: int, achievement: Achievement) -> None:
+        mask = self._user_achievements.get(user_id)
+        if mask is not None:
+            self._user_achievements[user_id] = mask | 1 << achievement.pk
+
+    async def _grant_achievement(self, user: User | Member, achievement_id: str) -> None:
         try:
-            db_user, _ = await UserModel.get_or_create(user_id=user.id)
-            achievement = await Achievement.get(achievement_id=achievement_id)
+            achievement = self.achievements.get(achievement_id)
+            if achievement is None:
+                logger.warning(
+                    f"Attempted to grant a non-existent "
+                    f"achievement with id: '{achievement_id}'"
+                )
+                return
 
+            db_user, _ = await UserModel.get_or_create(user_id=user.id)
             _, created = await UserAchievement.get_or_create(
                 user=db_user, achievement=achievement
             )
+            self._mark_granted(user.id, achievement)
             if created:
+                rank_service.increment_score("achievements", user.id)
                 logger.info(
                     f"Granted achievement '{achievement.name}' to user {user.id}"
                 )
                 await response_utils.send_dm_message(user, achievement)
 
-        except DoesNotExist:
-            logger.warning(
-                f"Attempted to grant a non-existent "
-                f"achievement with id: '{achievement_id}'"
-            )
         except Exception as e:
             logger.error(
                 f"Error granting achievement '{achievement_id}' "
                 f"to user {user.id}: {e}"
             )
 
+    async def get_user_achievements_ids(self, user_id: int) -> Set[str]:
+        if not self.achievements:
+            await self.load_achievements()
+
+        mask = await self._get_user_achievements_mask(user_id)
+        return {
+            achievement_id for achievement_id, achievement in self.achievements.items()
+            if mask >> achievement.pk & 1
+        }
+
     @staticmethod
-    async def _get_user_achievements_ids(user_id: int) -> Set[str]:
-        db_user, _ = await UserModel.get_or_create(user_id=user_id)
-        achievements = await UserAchievement.filter(
-            user=db_user
-        ).prefetch_related("achievement")
-        return {ua.achievement.achievement_id for ua in achievements}
-
-    async def handle_cooldown_achievement(self, user: User):
-        achievements = await self._get_user_achievements_ids(user.id)
-        if "workaholic" not in achievements:
-            await self._grant_achievement(user, "workaholic")
-
-    async def handle_view_card_achievements(self, user: User, target_user: User):
-        achievements = await self._get_user_achievements_ids(user.id)
-
-        if "welcome" not in achievements:
-            await self._grant_achievement(user, "welcome")
-
-        if user.id != target_user.id and "inspector" not in achievements:
-            await self._grant_achievement(user, "inspector")
-
-    async def handle_dossier_achievements(self, user: User):
-        achievements = await self._get_user_achievements_ids(user.id)
-        if "personal_file" not in achievements:
-            await self._grant_achievement(user, "personal_file")
-
-    async def handle_article_achievements(self, user: User, article: SCPObject):
-        db_user, _ = await UserModel.get_or_create(user_id=user.id)
-        achievements = await self._get_user_achievements_ids(user.id)
-
-        viewed_count = await db_user.viewed_objects.all().count()
-
-        if viewed_count >= 1 and "first_look" not in achievements:
-            await self._grant_achievement(user, "first_look")
-        if viewed_count >= 10 and "researcher" not in achievements:
-            await self._grant_achievement(user, "researcher")
-        if viewed_count >= 100 and "archivist" not in achievements:
-            await self._grant_achievement(user, "archivist")
-
-        if article.object_class == "keter" and "danger_face" not in achievements:
-            await self._grant_achievement(user, "danger_face")
-        if article.object_class == "thaumiel" and "thaumiel_secret" not in achievements:
-            await self._grant_achievement(user, "thaumiel_secret")
-
-    async def handle_work_achievements(
-            self, user: User, is_risky: bool, is_success: bool
-    ):
-        achievements = await self._get_user_achievements_ids(user.id)
-
-        if not is_risky and "first_paycheck" not in achievements:
-            await self._grant_achievement(user, "first_paycheck")
-        if is_risky and is_success and "risky_business" not in achievements:
-            await self._grant_achievement(user, "risky_business")
-        if is_risky and not is_success and "unlucky_adventurer" not in achievements:
-            await self._grant_achievement(user, "unlucky_adventurer")
-
-    async def handle_economy_achievements(
-            self, user: User, amount_transferred: int = 0
-    ):
-        db_user, _ = await UserModel.get_or_create(user_id=user.id)
-        achievements = await self._get_user_achievements_ids(user.id)
-
-        if db_user.balance >= 1_000_000 and "balance_1m" not in achievements:
-            await self._grant_achievement(user, "balance_1m")
-        if db_user.reputation >= 300_000 and "reputation_300k" not in achievements:
-            await self._grant_achievement(user, "reputation_300k")
-        if db_user.reputation >= 3_000_000 and "reputation_3m" not in achievements:
-            await self._grant_achievement(user, "reputation_3m")
-
-        if amount_transferred > 100_000 and "philanthropist" not in achievements:
-            await self._grant_achievement(user, "philanthropist")
-
-    async def handle_crystallization_achievements(
-            self, user: User, state: CrystallizationState, is_loss: bool
-    ):
-        achievements = await self._get_user_achievements_ids(user.id)
-        if is_loss and "game_crystal_loss" not in achievements:
-            await self._grant_achievement(user, "game_crystal_loss")
-        if not is_loss and state.multiplier >= 2.0 and "game_crystal_win_x2.0" not in achievements:
-            await self._grant_achievement(user, "game_crystal_win_x2.0")
-
-    async def handle_coin_flip_achievements(
-            self, user: User, winnings: int
-    ):
-        achievements = await self._get_user_achievements_ids(user.id)
-        if winnings >= 10_000 and "game_coin_win_10_000" not in achievements:
-            await self._grant_achievement(user, "game_coin_win_10_000")
-
-    async def handle_candy_achievements(
-            self, user: User, player_taken: int, is_loss: bool
-    ):
-        achievements = await self._get_user_achievements_ids(user.id)
-        if is_loss and "game_candy_loss" not in achievements:
-            await self._grant_achievement(user, "game_candy_loss")
-        if not is_loss and player_taken == 2 and "game_candy_win_2" not in achievements:
-            await self._grant_achievement(user, "game_candy_win_2")
-
-    async def handle_coguard_achievements(
-            self, user: User, state: CoguardState, is_loss: bool
-    ):
-        achievements = await self._get_user_achievements_ids(user.id)
-        if is_loss and state.win_streak == 0 and "game_coguard_loss_first" not in achievements:
-            await self._grant_achievement(user, "game_coguard_loss_first")
-        if not is_loss and state.win_streak >= 7 and "game_coguard_streak_7" not in achievements:
-            await self._grant_achievement(user, "game_coguard_streak_7")
-        if not is_loss and (state.bet * state.multiplier) >= 30000 and "big_winner" not in achievements:
-            await self._grant_achievement(user, "big_winner")
-
-    async def handle_hole_achievements(
-            self, user: User, is_jackpot: bool, is_o5_win: bool, winnings: int
-    ):
-        achievements = await self._get_user_achievements_ids(user.id)
-        if winnings > 0 and "game_hole_win" not in achievements:
-            await self._grant_achievement(user, "game_hole_win")
-        if is_jackpot and "game_hole_jackpot" not in achievements:
-            await self._grant_achievement(user, "game_hole_jackpot")
-        if is_o5_win and "game_hole_o5_win" not in achievements:
-            await self._grant_achievement(user, "game_hole_o5_win")
-        if winnings >= 30000 and "big_winner" not in achievements:
-            await self._grant_achievement(user, "big_winner")
-
-    async def handle_scp173_achievements(
-            self, user: User, is_host: bool, is_survivor: bool, is_first_death: bool, pot: int = 0
-    ):
-        achievements = await self._get_user_achievements_ids(user.id)
-        if is_host and "game_scp173_host" not in achievements:
-            await self._grant_achievement(user, "game_scp173_host")
-        if is_survivor and "game_scp173_survivor" not in achievements:
-            await self._grant_achievement(user, "game_scp173_survivor")
-        if is_first_death and "game_scp173_first_death" not in achievements:
-            await self._grant_achievement(user, "game_scp173_first_death")
-        if pot >= 30000 and "big_winner" not in achievements:
-            await self._grant_achievement(user, "big_winner")
-
-    async def handle_shop_achievements(self, user: User, bought_item_id: str):
-        db_user, _ = await UserModel.get_or_create(user_id=user.id)
-        achievements = await self._get_user_achievements_ids(user.id)
-
-        if "first_purchase" not in achievements:
-            await self._grant_achievement(user, "first_purchase")
-
-        card_count = await UserItem.filter(user=db_user, item__item_type=ItemType.CARD).count()
-        if card_count >= 5 and "card_collector" not in achievements:
-            await self._grant_achievement(user, "card_collector")
-
-        purchasable_card_ids = set(
-            await Item.filter(
-                item_type=ItemType.CARD, price__gt=0
-            ).values_list("item_id", flat=True)
+    async def _load_counters(user_id: int) -> UserAchievementCounters:
+        viewed_articles = await ViewedScpObject.filter(user__user_id=user_id).count()
+        card_ids = await UserItem.filter(
+            user__user_id=user_id, item__item_type=ItemType.CARD
+        ).values_list("item__item_id", flat=True)
+        return UserAchievementCounters(viewed_articles=viewed_articles, card_ids=set(card_ids))
+
+    async def _get_counters(self, user_id: int) -> UserAchievementCounters:
+        counters = self._user_counters.get(user_id)
+        if counters is None:
+            counters = await self._load_counters(user_id)
+            self._user_counters[user_id] = counters
+        return counters
+
+    def _update_counters(self, event: AchievementEvent) -> None:
+        counters = self._user_counters.get(event.user.id)
+        if counters is None:
+            return
+
+        if isinstance(event, ArticleViewedEvent) and event.is_new_view:
+            counters.viewed_articles += 1
+        elif isinstance(event, ItemBoughtEvent) and event.item_id in variables.cards:
+            counters.card_ids.add(event.item_id)
+
+    def forget_counters(self, user_id: int) -> None:
+        self._user_counters.pop(user_id, None)
+
+    async def _build_context(self, event: AchievementEvent) -> Dict[str, Any]:
+        context = {item.name: getattr(event, item.name) for item in fields(event) if item.name != "user"}
+        if event.event_type in self.counter_events:
+            counters = await self._get_counters(event.user.id)
+            context["viewed_articles"] = counters.viewed_articles
+            context["card_count"] = len(counters.card_ids)
+            context["missing_purchasable_cards"] = len(self.purchasable_card_ids - counters.card_ids)
+        return context
+
+    def _matches(self, rule: AchievementRule, context: Dict[str, Any]) -> bool:
+        return all(
+            condition.field in context
+            and self.operators[condition.operator](context[condition.field], condition.value)
+            for condition in rule.conditions
         )
-        user_cards = await UserItem.filter(
-            user=db_user, item__item_type=ItemType.CARD
-        ).prefetch_related("item")
-        user_card_ids = {uc.item.item_id for uc in user_cards}
-
-        if purchasable_card_ids.issubset(
-                user_card_ids
-        ) and "access_master" not in achievements:
-            await self._grant_achievement(user, "access_master")
-
-        achievements_map = {
-            "keycard_scientist": "scientist_promotion",
-            "keycard_major_scientist": "major_scientist_promotion",
-            "keycard_engineering": "engineer_promotion",
-            "keycard_zone_manager": "upcoming_promotion",
-            "keycard_security": "security_promotion",
-            "keycard_sergeant_mog": "sergeant_promotion",
-            "keycard_lieutenant_mog": "lieutenant_promotion",
-            "keycard_captain_mog": "upcoming_promotion",
-            "keycard_zone_director": "zone_authority",
-            "keycard_o5": "o5_council",
-            "keycard_redacted": "administrator_presence"
-        }
-        if bought_item_id in achievements_map and achievements_map[bought_item_id] not in achievements:
-            await self._grant_achievement(user, achievements_map[bought_item_id])
 
+    async def handle_event(self, event: AchievementEvent) -> None:
+        try:
+            self._update_counters(event)
+            rules = self.rules.get(event.event_type)
+            if not rules:
+                return
+
+            if not self.achievements:
+                await self.load_achievements()
+
+            mask = await self._get_user_achievements_mask(event.user.id)
+            context = await self._build_context(event)
+
+            unlocked = []
+            for achievement_id, rule in rules:
+                achievement = self.achievements.get(achievement_id)
+                if achievement and mask >> achievement.pk & 1:
+                    continue
+                if achievement_id not in unlocked and self._matches(rule, context):
+                    unlocked.append(achievement_id)
+
+            for achievement_id in unlocked:
+                await self._grant_achievement(event.user, achievement_id)
+
+        except Exception as e:
+            logger.error(
+                f"Error handling achievement event '{event.event_type}' "
+                f"for user {event.user.id}: {e}"
+            )
 
 achievement_handler_service = AchievementHandlerService()
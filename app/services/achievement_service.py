@@ -5,9 +5,11 @@ from tortoise.functions import Count
 
 from app.config import logger
 from app.core.models import Achievement, User as UserModel, UserAchievement
-from app.core.schemas import AchievementConfig
+from app.core.schemas import AchievementConfig, KeysetPage, PageRequest
 from app.core.variables import variables
 from app.embeds import info_embeds
+from app.services import achievement_handler_service, rank_service
+from app.utils.pagination_utils import pagination_utils
 from app.views.pagination_view import PaginationView
 
 
@@ -29,6 +31,7 @@ class AchievementService:
         if to_delete_ids:
             await Achievement.filter(achievement_id__in=to_delete_ids).delete()
             logger.info(f"Deleted {len(to_delete_ids)} obsolete achievements")
+            await rank_service.rebuild()
 
         for ach_id, ach_data in self.achievements_config.items():
             db_ach = db_achievements.get(ach_id)
@@ -48,23 +51,23 @@ class AchievementService:
                 db_ach.icon = ach_data.icon
                 await db_ach.save()
                 logger.info(f"Updated achievement: {ach_data.name}")
+
+        await achievement_handler_service.load_achievements()
         logger.info("Achievement synchronization complete")
 
     @staticmethod
     async def _get_paginated_user_achievements(
-            user_id: int, limit: int, offset: int = 0
-    ) -> Tuple[List[Achievement], bool, bool]:
+            user_id: int, limit: int, page_request: Optional[PageRequest] = None
+    ) -> KeysetPage:
         db_user, _ = await UserModel.get_or_create(user_id=user_id)
-        user_achievements_query = UserAchievement.filter(user=db_user).select_related("achievement").order_by(
-            "achievement__id").offset(offset).limit(limit + 1)
-        user_achievements_raw = await user_achievements_query
-        achievements_raw = [ua.achievement for ua in user_achievements_raw]
-
-        has_next = len(achievements_raw) > limit
-        current_page_items = achievements_raw[:limit]
-        has_previous = offset > 0
-
-        return current_page_items, has_previous, has_next
+        page = await pagination_utils.fetch_keyset_page(
+            UserAchievement.filter(user=db_user).select_related("achievement"),
+            [("achievement_id", False)],
+            limit,
+            page_request
+        )
+        page.items = [ua.achievement for ua in page.items]
+        return page
 
     @staticmethod
     async def get_total_user_achievements_count(user_id: int) -> int:
@@ -72,37 +75,29 @@ class AchievementService:
         return await UserAchievement.filter(user=user).count()
 
     async def init_achievements_message(self, user: Member | User) -> Optional[Tuple[Embed, List[ui.View]]]:
-        items, _, has_next = await self._get_paginated_user_achievements(
-            user_id=user.id, limit=variables.achievements_per_page
-        )
-
-        embed = await info_embeds.format_achievements_embed(user, items)
-        view = PaginationView(
-            criteria="user_achievements",
-            disable_first=True,
-            disable_previous=True,
-            disable_next=not has_next,
-            disable_last=not has_next,
-            target_user_id=user.id
-        )
-        return embed, [view] if view.children else []
+        return await self.edit_achievements_message(user, PageRequest())
 
     async def edit_achievements_message(
-            self, user: User, page: int, offset: int
+            self, user: Member | User, page_request: PageRequest, total_count: Optional[int] = None
     ) -> Optional[Tuple[Embed, List[ui.View]]]:
-        items, has_previous, has_next = await self._get_paginated_user_achievements(
-            user_id=user.id, limit=variables.achievements_per_page, offset=offset
+        if total_count is None:
+            total_count = await self.get_total_user_achievements_count(user.id)
+        page = await self._get_paginated_user_achievements(
+            user_id=user.id, limit=variables.achievements_per_page, page_request=page_request
         )
 
-        embed = await info_embeds.format_achievements_embed(user, items, offset=offset)
+        embed = await info_embeds.format_achievements_embed(user, page.items, offset=page_request.offset)
         view = PaginationView(
             criteria="user_achievements",
-            current_page=page,
-            disable_first=not has_previous,
-            disable_previous=not has_previous,
-            disable_next=not has_next,
-            disable_last=not has_next,
-            target_user_id=user.id
+            current_page=page_request.page,
+            disable_first=not page.has_previous,
+            disable_previous=not page.has_previous,
+            disable_next=not page.has_next,
+            disable_last=not page.has_next,
+            target_user_id=user.id,
+            previous_cursor=page.previous_cursor,
+            next_cursor=page.next_cursor,
+            total_count=total_count
         )
         return embed, [view] if view.children else []
 
@@ -135,21 +130,13 @@ class AchievementService:
         return await Achievement.all().count()
 
     async def init_stats_message(self) -> Optional[Tuple[Embed, List[ui.View]]]:
-        stats, _, has_next = await self.get_achievements_statistics(
-            limit=variables.achievements_per_page
-        )
-        total_players = await self.get_total_players_with_achievements_count()
-        embed = await info_embeds.format_achievement_stats_embed(stats, total_players)
-        view = PaginationView(
-            criteria="achievements_stats",
-            disable_first=True,
-            disable_previous=True,
-            disable_next=not has_next,
-            disable_last=not has_next
-        )
-        return embed, [view] if view.children else []
+        return await self.edit_stats_message(1, 0)
 
-    async def edit_stats_message(self, page: int, offset: int) -> Optional[Tuple[Embed, List[ui.View]]]:
+    async def edit_stats_message(
+            self, page: int, offset: int, total_count: Optional[int] = None
+    ) -> Optional[Tuple[Embed, List[ui.View]]]:
+        if total_count is None:
+            total_count = await self.get_total_achievements_count()
         stats, has_previous, has_next = await self.get_achievements_statistics(
             limit=variables.achievements_per_page, offset=offset
         )
@@ -161,7 +148,8 @@ class AchievementService:
             disable_first=not has_previous,
             disable_previous=not has_previous,
             disable_next=not has_next,
-            disable_last=not has_next
+            disable_last=not has_next,
+            total_count=total_count
         )
         return embed, [view] if view.children else []
 
@@ -1,87 +1,98 @@
 import asyncio
-import io
-import textwrap
-from typing import Tuple
+import hashlib
+from typing import Optional, Tuple
 
-from PIL import Image, ImageDraw, ImageFont
-from disnake import File, Embed, ui
+from disnake import Embed, ui
 
+from app.config import logger
 from app.core.models import SCPObject
+from app.core.schemas import ArticleRenderJob, AttachmentImage
 from app.core.variables import variables
 from app.embeds import info_embeds
+from app.services import render_service
+from app.utils.attachment_utils import attachment_registry
+from app.utils.image_cache_utils import ImageCache
 from app.views.info_views import ArticleView
 
 
 class ArticleService:
     def __init__(self):
         self.wiki_url = variables.wiki_url
-        self.template_path = variables.article_template_path
-        self.number_font_path = variables.primary_font_path
-        self.title_font_path = variables.secondary_font_path
-
-    @staticmethod
-    def _draw_text_with_shadow(draw, pos, text, font, main_color):
-        x, y = pos
-        shadow_pos = (x + (2, 2)[0], y + (2, 2)[1])
-        draw.text(shadow_pos, text, font=font, fill=(0, 0, 0, 150))
-        draw.text(pos, text, font=font, fill=main_color)
-
-    def _generate_image_sync(self, number: str, title: str) -> io.BytesIO:
-        with Image.open(self.template_path).convert("RGBA") as base_image:
-            img_width, img_height = base_image.size
-
-            text_layer = Image.new("RGBA", base_image.size, (0, 0, 0, 0))
-            draw = ImageDraw.Draw(text_layer)
-
-            number_font_size = int(img_height / 8)
-            title_font_size = int(img_height / 10)
-            number_font = ImageFont.truetype(self.number_font_path, number_font_size)
-            title_font = ImageFont.truetype(self.title_font_path, title_font_size)
-
-            avg_char_width = title_font_size * 0.6
-            max_chars_per_line = int((img_width * 0.95) / avg_char_width)
-            wrapped_title_lines = textwrap.wrap(title, width=max_chars_per_line, break_long_words=True)
-
-            spacing_after_number = int(img_height / 20)
-            title_line_bbox = draw.textbbox((0, 0), "A", font=title_font)
-            title_line_height = title_line_bbox[3] - title_line_bbox[1]
-            spacing_between_lines = int(title_line_height * 0.3)
-
-            current_y = img_height / 2
-
-            number_bbox = draw.textbbox((0, 0), number, font=number_font)
-            number_width = number_bbox[2] - number_bbox[0]
-            number_height = number_bbox[3] - number_bbox[1]
-            number_x = (img_width - number_width) / 2
-            self._draw_text_with_shadow(draw, (number_x, current_y), number, number_font, (50, 50, 50))
-            current_y += number_height + spacing_after_number
-
-            for line in wrapped_title_lines:
-                line_bbox = draw.textbbox((0, 0), line, font=title_font)
-                line_width = line_bbox[2] - line_bbox[0]
-                line_x = (img_width - line_width) / 2
-                self._draw_text_with_shadow(draw, (line_x, current_y), line, title_font, (50, 50, 50))
-                current_y += title_line_height + spacing_between_lines
-
-            out_image = Image.alpha_composite(base_image, text_layer)
-
-            buffer = io.BytesIO()
-            out_image.save(buffer, format="PNG")
-            buffer.seek(0)
-            return buffer
-
-    async def _create_article_image(self, article: SCPObject) -> File:
-        image_buffer = await asyncio.to_thread(
-            self._generate_image_sync, article.number, article.title
+        self.image_cache = ImageCache(
+            name="article",
+            memory_budget=variables.article_cache_memory_budget,
+            disk_dir=variables.article_cache_dir_path,
+            disk_budget=variables.article_cache_disk_budget
         )
+        self._render_version: Optional[str] = None
+        self._pregenerate_task: Optional[asyncio.Task] = None
 
-        return File(fp=image_buffer, filename=f"{article.number.lower()}_title.png")
-
-    async def create_article_components(self, article: SCPObject) -> Tuple[Embed, ui.View]:
+    @staticmethod
+    def _hash_render_assets() -> str:
+        digest = hashlib.sha256(str(variables.article_render_version).encode("utf-8"))
+        for path in (variables.article_template_path, variables.primary_font_path, variables.secondary_font_path):
+            with open(path, "rb") as file:
+                digest.update(file.read())
+        return digest.hexdigest()
+
+    async def _get_cache_key(self, article: SCPObject) -> str:
+        if self._render_version is None:
+            self._render_version = await asyncio.to_thread(self._hash_render_assets)
+        return self.image_cache.make_key(article.id, article.number, article.title, self._render_version)
+
+    async def _render_article_image(self, article: SCPObject, cache_key: str, keep_in_memory: bool = True) -> bytes:
+        image_bytes = await render_service.render(ArticleRenderJob(number=article.number, title=article.title))
+        await self.image_cache.put(cache_key, image_bytes, keep_in_memory=keep_in_memory)
+        return image_bytes
+
+    async def _create_article_image(self, article: SCPObject) -> AttachmentImage:
+        cache_key = await self._get_cache_key(article)
+        image_bytes = await self.image_cache.get(cache_key)
+        if image_bytes is None:
+            image_bytes = await self._render_article_image(article, cache_key)
+        return attachment_registry.get_image(image_bytes, f"{article.number.lower()}_title.png")
+
+    async def create_article_components(self, article: SCPObject) -> Tuple[Embed, ui.View, AttachmentImage]:
         image = await self._create_article_image(article)
-        embed = await info_embeds.format_article_embed(article, image)
+        embed = await info_embeds.format_article_embed(article)
         view = ArticleView(article)
-        return embed, view
+        return embed, view, image
+
+    async def pregenerate_article_images(self) -> None:
+        missing = []
+        for article in await SCPObject.all().only("id", "number", "title"):
+            cache_key = await self._get_cache_key(article)
+            if not await self.image_cache.contains(cache_key):
+                missing.append((article, cache_key))
+
+        if not missing:
+            logger.info("All article title images are pre-generated")
+            return
+
+        logger.info(f"Pre-generating {len(missing)} article title images..")
+        semaphore = asyncio.Semaphore(variables.article_pregenerate_concurrency)
+        failed = 0
+
+        async def generate(article: SCPObject, cache_key: str) -> None:
+            nonlocal failed
+            async with semaphore:
+                try:
+                    await self._render_article_image(article, cache_key, keep_in_memory=False)
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"Failed to pre-generate the title image of {article.number}: {e}")
+
+        await asyncio.gather(*(generate(article, cache_key) for article, cache_key in missing))
+        logger.info(f"Pre-generated {len(missing) - failed} article title images ({failed} failed)")
+
+    def start_pregeneration(self) -> None:
+        if self._pregenerate_task is None or self._pregenerate_task.done():
+            self._pregenerate_task = asyncio.create_task(self.pregenerate_article_images())
+
+    def stop_pregeneration(self) -> None:
+        if self._pregenerate_task is not None:
+            self._pregenerate_task.cancel()
+            self._pregenerate_task = None
 
 
 article_service = ArticleService()
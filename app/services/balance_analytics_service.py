@@ -1,26 +1,36 @@
 import asyncio
 import io
 from datetime import datetime, timedelta
-from typing import List, Optional, Tuple, Dict
+from typing import Dict, List, Optional, Tuple, Type
 
 import matplotlib.dates as mdates
 import matplotlib.pyplot as plt
 import numpy as np
 import pytz
+from cachetools import LRUCache
 from disnake import User, Embed, File
 from matplotlib.font_manager import FontProperties
 from scipy.interpolate import pchip_interpolate
 
 from app.config import logger, config
-from app.core.models import User as UserModel, BalanceHistory
-from app.core.schemas import BalanceAnalyticsData
+from app.core.models import (
+    User as UserModel,
+    BalanceHistory,
+    BalanceRollup,
+    BalanceRollupDaily,
+    BalanceRollupHourly
+)
+from app.core.schemas import BalanceAnalyticsData, BalanceReport
 from app.core.variables import variables
 from app.embeds.economy_embeds import format_report_embed
 from app.localization import t
+from app.services import balance_archive_service, balance_history_service
 from app.utils.time_utils import time_utils
 
 
 class BalanceAnalyticsService:
+    epoch = datetime(1970, 1, 1, tzinfo=pytz.UTC)
+
     def __init__(self):
         self.period_map = {
             "day": timedelta(days=1),
@@ -32,120 +42,117 @@ class BalanceAnalyticsService:
             "week": t("commands.balance_stats.params.period.choices.week"),
             "month": t("commands.balance_stats.params.period.choices.month"),
         }
+        self.rollup_models: Dict[str, Type[BalanceRollup]] = {
+            "week": BalanceRollupHourly,
+            "month": BalanceRollupDaily,
+        }
+        self.report_cache: LRUCache[Tuple, BalanceReport] = LRUCache(
+            maxsize=variables.balance_report_cache_budget, getsizeof=lambda report: len(report.image)
+        )
 
     async def _fetch_data_with_initial_balance(
-            self, user_id: int, period: str
-    ) -> Tuple[Optional[int], List[BalanceHistory]]:
-        user, _ = await UserModel.get_or_create(user_id=user_id)
-        current_time = await time_utils.get_current()
-        start_date = current_time - self.period_map[period]
-        last_record_before_period = (
-            await BalanceHistory.filter(user=user, timestamp__lt=start_date)
-            .order_by("-timestamp")
-            .first()
-        )
-        initial_balance = (
-            last_record_before_period.new_balance if last_record_before_period else 0
-        )
-        history_in_period = await BalanceHistory.filter(
-            user=user, timestamp__gte=start_date
-        ).order_by("timestamp")
-        return initial_balance, history_in_period
+            self, user: UserModel, start_date: datetime, period: str
+    ) -> Tuple[int, List[Tuple[datetime, int]]]:
+        last_record_before_period = await BalanceHistory.filter(
+            user=user, timestamp__lt=start_date
+        ).order_by("-timestamp").first().values_list("new_balance", flat=True)
+        if last_record_before_period is None:
+            last_record_before_period = await balance_archive_service.get_last_balance_before(user.pk, start_date)
+        initial_balance = last_record_before_period or 0
+
+        rollup_model = self.rollup_models.get(period)
+        if rollup_model is None:
+            history_in_period = await BalanceHistory.filter(
+                user=user, timestamp__gte=start_date
+            ).order_by("timestamp", "id").values_list("timestamp", "new_balance")
+            return initial_balance, history_in_period
+
+        rollups_in_period = await rollup_model.filter(
+            user=user,
+            bucket_start__gte=rollup_model.get_bucket_start(start_date),
+            last_change_at__gte=start_date
+        ).order_by("bucket_start").values_list("last_change_at", "close_balance")
+        return initial_balance, rollups_in_period
 
     @staticmethod
-    def _calculate_stats(history: List[BalanceHistory]) -> BalanceAnalyticsData:
-        sent_reason_prefix = t("economy.reasons.transfer_sent").split("{")[0]
-        received_reason_prefix = t("economy.reasons.transfer_received").split("{")[0]
-
-        filtered_history = [
-            h for h in history
-            if not h.reason.startswith(sent_reason_prefix) and not h.reason.startswith(received_reason_prefix)
-        ]
-
-        gains = [h for h in filtered_history if h.change_amount > 0]
-        losses = [h for h in filtered_history if h.change_amount < 0]
-
-        total_earned = sum(h.change_amount for h in gains)
-        total_lost = sum(h.change_amount for h in losses)
-        if gains:
-            biggest_gain = max(
-                gains, key=lambda x: x.change_amount
-            )
-        else:
-            biggest_gain = None
-
-        if losses:
-            biggest_loss = min(losses, key=lambda x: x.change_amount)
-        else:
-            biggest_loss = None
-
+    async def _calculate_stats(user: UserModel, start_date: datetime) -> BalanceAnalyticsData:
+        stats = await BalanceHistory.get_period_stats(
+            user.pk, start_date, balance_history_service.transfer_reasons
+        )
+        no_data = t("ui.analytics.no_data")
         return BalanceAnalyticsData(
-            total_earned=total_earned,
-            total_lost=abs(total_lost),
+            total_earned=int(stats["total_earned"]),
+            total_lost=int(stats["total_lost"]),
             biggest_gain_reason=(
-                biggest_gain.reason
-                if biggest_gain
-                else t("ui.analytics.no_data")
-            ),
-            biggest_gain_amount=(
-                biggest_gain.change_amount
-                if biggest_gain else 0
+                stats["biggest_gain_reason"].render(stats["biggest_gain_reason_params"])
+                if stats["biggest_gain_reason"] is not None
+                else no_data
             ),
+            biggest_gain_amount=stats["biggest_gain_amount"],
             biggest_loss_reason=(
-                biggest_loss.reason
-                if biggest_loss
-                else t("ui.analytics.no_data")
-            ),
-            biggest_loss_amount=(
-                abs(biggest_loss.change_amount)
-                if biggest_loss else 0
+                stats["biggest_loss_reason"].render(stats["biggest_loss_reason_params"])
+                if stats["biggest_loss_reason"] is not None
+                else no_data
             ),
+            biggest_loss_amount=stats["biggest_loss_amount"],
         )
 
+    @staticmethod
+    def _to_epoch_microseconds(value: datetime) -> int:
+        return (value - BalanceAnalyticsService.epoch) // timedelta(microseconds=1)
+
+    @staticmethod
+    def _get_bucket_indexes(
+            timestamps: np.ndarray, num_segments: int, period_start: int, segment_duration: int
+    ) -> np.ndarray:
+        offsets = (timestamps - period_start).astype(np.float64) / 1e6
+        bucket_indexes = np.trunc(offsets / (segment_duration / 1e6)).astype(np.int64)
+        return np.minimum(bucket_indexes, num_segments - 1)
+
     @staticmethod
     def _downsample_data(
-            dates: List[datetime],
-            balances: List[int],
+            timestamps: np.ndarray,
+            balances: np.ndarray,
             num_segments: int,
-            period_start: datetime,
-            period_end: datetime,
-    ) -> Tuple[List[datetime], List[int]]:
-        points = list(zip(dates, balances))
-        if not points:
-            return [], []
-
-        start_time, end_time = period_start, period_end
-        total_duration = end_time - start_time
+            period_start: int,
+            period_end: int,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        if len(timestamps) == 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
 
-        initial_period_balance = points[0][1]
+        initial_period_balance = int(balances[0])
+        total_duration = period_end - period_start
 
-        if total_duration.total_seconds() == 0:
-            return [start_time, end_time], [initial_period_balance, balances[-1]]
+        if total_duration == 0:
+            return (
+                np.array([period_start, period_end], dtype=np.int64),
+                np.array([initial_period_balance, balances[-1]], dtype=np.int64),
+            )
 
-        segment_duration = total_duration / num_segments
+        segment_duration = timedelta(microseconds=total_duration) / num_segments // timedelta(microseconds=1)
 
-        balance_buckets: List[List[int]] = [[] for _ in range(num_segments)]
-        for time, balance in points[1:]:
-            time_offset = time - start_time
-            bucket_index = int(time_offset.total_seconds() / segment_duration.total_seconds())
-            bucket_index = min(bucket_index, num_segments - 1)
-            balance_buckets[bucket_index].append(balance)
+        bucket_indexes = BalanceAnalyticsService._get_bucket_indexes(
+            timestamps[1:], num_segments, period_start, segment_duration
+        )
+        order = np.argsort(bucket_indexes, kind="stable")
+        bucket_balances = balances[1:][order]
+        bucket_bounds = np.searchsorted(bucket_indexes[order], np.arange(num_segments + 1))
 
         selected_balances: List[Optional[int]] = [None] * num_segments
-        last_balance = balances[-1]
+        last_balance = int(balances[-1])
 
         selected_balances[-1] = last_balance
         target_value = last_balance
 
         for i in range(num_segments - 2, -1, -1):
-            current_bucket = balance_buckets[i]
-            if not current_bucket:
+            current_bucket = bucket_balances[bucket_bounds[i]:bucket_bounds[i + 1]]
+            if len(current_bucket) == 0:
                 continue
 
-            if target_value == 0 and any(val != 0 for val in current_bucket):
-                closest_value = current_bucket[-1]
+            if target_value == 0 and np.any(current_bucket != 0):
+                closest_value = int(current_bucket[-1])
             else:
-                closest_value = min(current_bucket, key=lambda x: abs(x - target_value))
+                closest_value = int(current_bucket[np.argmin(np.abs(current_bucket - target_value))])
 
             selected_balances[i] = closest_value
             target_value = closest_value
@@ -159,78 +166,67 @@ class BalanceAnalyticsService:
             if stabilized_balances[i] is None:
                 stabilized_balances[i] = stabilized_balances[i - 1]
 
-        segment_end_times = [
-            period_start + segment_duration * (i + 1)
-            for i in range(num_segments)
-        ]
-
-        final_dates = [period_start] + segment_end_times
-        final_balances = [initial_period_balance] + stabilized_balances
+        final_dates = period_start + segment_duration * np.arange(num_segments + 1, dtype=np.int64)
+        final_balances = np.array([initial_period_balance] + stabilized_balances, dtype=np.int64)
 
         return final_dates, final_balances
 
     @staticmethod
     def _downsample_by_taking_last(
-            dates: List[datetime],
-            balances: List[int],
+            timestamps: np.ndarray,
+            balances: np.ndarray,
             num_segments: int,
-            period_start: datetime,
-            period_end: datetime,
-    ) -> Tuple[List[datetime], List[int]]:
-        points = list(zip(dates, balances))
-        if len(points) <= 1:
-            return dates, balances
+            period_start: int,
+            period_end: int,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        if len(timestamps) <= 1:
+            return timestamps, balances
 
         total_duration = period_end - period_start
-        if total_duration.total_seconds() <= 0:
-            return dates, balances
-
-        segment_duration = total_duration / num_segments
+        if total_duration <= 0:
+            return timestamps, balances
 
-        last_point_in_bucket: Dict[int, Tuple[datetime, int]] = {}
-        for time, balance in points:
-            time_offset = time - period_start
-            bucket_index = int(time_offset.total_seconds() / segment_duration.total_seconds())
-            bucket_index = min(bucket_index, num_segments - 1)
-            last_point_in_bucket[bucket_index] = (time, balance)
+        segment_duration = timedelta(microseconds=total_duration) / num_segments // timedelta(microseconds=1)
 
-        final_points = [points[0]]
-
-        for bucket_index in sorted(last_point_in_bucket.keys()):
-            final_points.append(last_point_in_bucket[bucket_index])
-
-        if final_points[-1] != points[-1]:
-            final_points.append(points[-1])
-
-        final_dates, final_balances = zip(*final_points)
-
-        return list(final_dates), list(final_balances)
-
-    async def _prepare_data_for_graph(
-            self, initial_balance: int, history: List[BalanceHistory], period: str
-    ) -> Tuple[List[datetime], List[int]]:
-        current_time = await time_utils.get_current()
-
-        start_date = current_time - self.period_map[period]
-        utc_tz = pytz.UTC
-        target_tz = pytz.timezone(config.timezone)
-
-        dates, balances = [start_date], [initial_balance]
-        for record in history:
-            aware_utc_timestamp = record.timestamp.replace(tzinfo=utc_tz)
-            localized_timestamp = aware_utc_timestamp.astimezone(target_tz)
+        bucket_indexes = BalanceAnalyticsService._get_bucket_indexes(
+            timestamps, num_segments, period_start, segment_duration
+        )
+        _, reversed_indexes = np.unique(bucket_indexes[::-1], return_index=True)
+        last_indexes = len(timestamps) - 1 - reversed_indexes
+
+        selected_indexes = np.concatenate(([0], last_indexes))
+        last_selected = selected_indexes[-1]
+        if timestamps[last_selected] != timestamps[-1] or balances[last_selected] != balances[-1]:
+            selected_indexes = np.append(selected_indexes, len(timestamps) - 1)
+
+        return timestamps[selected_indexes], balances[selected_indexes]
+
+    def _prepare_data_for_graph(
+            self, initial_balance: int, history: List[Tuple[datetime, int]], current_time: datetime, start_date: datetime
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        current_time = self._to_epoch_microseconds(current_time)
+        start_date = self._to_epoch_microseconds(start_date)
+
+        timestamps = np.empty(len(history) + 2, dtype=np.int64)
+        balances = np.empty(len(history) + 2, dtype=np.int64)
+        timestamps[0], balances[0] = start_date, initial_balance
+        timestamps[1:len(history) + 1] = np.array(
+            [timestamp.replace(tzinfo=None) for timestamp, _ in history], dtype="datetime64[us]"
+        ).astype(np.int64)
+        balances[1:len(history) + 1] = np.fromiter(
+            (balance for _, balance in history), dtype=np.int64, count=len(history)
+        )
 
-            dates.append(localized_timestamp)
-            balances.append(record.new_balance)
-        if not history or dates[-1] < current_time:
-            dates.append(current_time)
-            balances.append(balances[-1])
-        return dates, balances
+        size = len(history) + 1
+        if not history or timestamps[size - 1] < current_time:
+            timestamps[size], balances[size] = current_time, balances[size - 1]
+            size += 1
+        return timestamps[:size], balances[:size]
 
     def _generate_graph_image_sync(
             self,
-            dates: List[datetime],
-            balances: List[int],
+            timestamps: np.ndarray,
+            balances: np.ndarray,
             user_name: str,
             period: str
     ) -> io.BytesIO:
@@ -249,12 +245,13 @@ class BalanceAnalyticsService:
         green_line_segments = 12 if period == "day" else 14
         gray_line_segments = green_line_segments * 3
 
-        raw_plot_dates, raw_plot_balances = self._downsample_by_taking_last(
-            dates, balances,
+        raw_plot_timestamps, raw_plot_balances = self._downsample_by_taking_last(
+            timestamps, balances,
             num_segments=gray_line_segments,
-            period_start=dates[0],
-            period_end=dates[-1]
+            period_start=int(timestamps[0]),
+            period_end=int(timestamps[-1])
         )
+        raw_plot_dates = raw_plot_timestamps.astype("datetime64[us]")
 
         if len(raw_plot_dates) >= 2:
             ax.plot(
@@ -270,21 +267,22 @@ class BalanceAnalyticsService:
                 label=t("ui.analytics.graph_legend_actual")
             )
 
-        simplified_dates, simplified_balances = self._downsample_data(
-            dates,
+        simplified_timestamps, simplified_balances = self._downsample_data(
+            timestamps,
             balances,
             num_segments=green_line_segments,
-            period_start=dates[0],
-            period_end=dates[-1]
+            period_start=int(timestamps[0]),
+            period_end=int(timestamps[-1])
         )
+        simplified_dates = simplified_timestamps.astype("datetime64[us]")
 
-        if all(item == 0 for item in simplified_balances):
+        if not np.any(simplified_balances):
             buf = io.BytesIO()
             plt.close(fig)
             return buf
 
         x_numeric = mdates.date2num(simplified_dates)
-        y = np.array(simplified_balances)
+        y = simplified_balances
 
         if len(x_numeric) >= 4:
             x_smooth_numeric = np.linspace(x_numeric.min(), x_numeric.max(), 300)
@@ -368,35 +366,55 @@ class BalanceAnalyticsService:
         plt.close(fig)
         return buf
 
-    async def generate_user_report(
-            self, user: User, period: str
-    ) -> Optional[Tuple[Embed, File]]:
+    async def _build_report(
+            self, db_user: UserModel, display_name: str, period: str, current_time: datetime
+    ) -> Optional[BalanceReport]:
+        start_date = current_time - self.period_map[period]
+
         initial_balance, history_in_period = (
-            await self._fetch_data_with_initial_balance(user.id, period)
+            await self._fetch_data_with_initial_balance(db_user, start_date, period)
         )
         if len(history_in_period) == 0:
             return None
 
-        stats = self._calculate_stats(history_in_period)
+        stats = await self._calculate_stats(db_user, start_date)
 
-        graph_dates, graph_balances = await self._prepare_data_for_graph(
-            initial_balance, history_in_period, period
+        graph_timestamps, graph_balances = self._prepare_data_for_graph(
+            initial_balance, history_in_period, current_time, start_date
         )
 
         image_buffer = await asyncio.to_thread(
             self._generate_graph_image_sync,
-            graph_dates,
+            graph_timestamps,
             graph_balances,
-            user.display_name,
+            display_name,
             period,
         )
 
         if image_buffer.getbuffer().nbytes == 0:
-            logger.warning(f"Graph generation for user {user.id} resulted in an empty image")
+            logger.warning(f"Graph generation for user {db_user.user_id} resulted in an empty image")
             return None
 
-        image_file = File(fp=image_buffer, filename="balance_graph.png")
-        embed = await format_report_embed(user, stats, image_file, self.period_locales.get(period, "").lower())
+        return BalanceReport(stats=stats, image=image_buffer.getvalue())
+
+    async def generate_user_report(
+            self, user: User, period: str
+    ) -> Optional[Tuple[Embed, File]]:
+        db_user, _ = await UserModel.get_or_create(user_id=user.id)
+        current_time = await time_utils.get_current()
+        watermark = await balance_history_service.get_watermark(db_user.pk)
+        time_bucket = int(current_time.timestamp()) // variables.balance_report_cache_bucket_seconds
+        cache_key = (user.id, period, watermark, time_bucket, user.display_name)
+
+        report = self.report_cache.get(cache_key)
+        if report is None:
+            report = await self._build_report(db_user, user.display_name, period, current_time)
+            if report is None:
+                return None
+            self.report_cache[cache_key] = report
+
+        image_file = File(fp=io.BytesIO(report.image), filename="balance_graph.png")
+        embed = await format_report_embed(user, report.stats, image_file, self.period_locales.get(period, "").lower())
         return embed, image_file
 
 
@@ -0,0 +1,178 @@
+import asyncio
+import glob
+import os
+import shutil
+import time
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+import pytz
+from tortoise import timezone
+
+from app.config import logger
+from app.core.models import BalanceHistory
+from app.core.variables import variables
+from app.services import balance_history_service
+
+
+class BalanceArchiveService:
+    epoch = datetime(1970, 1, 1, tzinfo=pytz.UTC)
+    columns: Dict[str, str] = {
+        "id": "int64",
+        "user_id": "int32",
+        "timestamp": "int64",
+        "change_amount": "int64",
+        "new_balance": "int64",
+        "reason": "int16",
+        "reason_params": "str",
+    }
+
+    def __init__(self):
+        self.archive_dir = variables.balance_archive_dir_path
+        self._task: Optional[asyncio.Task] = None
+        self._archives: Optional[Dict[str, Tuple[int, int, FrozenSet[int]]]] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        await balance_history_service.wait_for_partitioning()
+        while True:
+            await self.run_maintenance()
+            await asyncio.sleep(variables.balance_history_maintenance_interval)
+
+    async def run_maintenance(self) -> None:
+        try:
+            await self.ensure_partitions()
+            await self.apply_retention()
+        except Exception as e:
+            logger.error(f"Failed to maintain balance history partitions: {e}")
+
+    @classmethod
+    def _to_epoch_microseconds(cls, value: datetime) -> int:
+        return (value - cls.epoch) // timedelta(microseconds=1)
+
+    async def ensure_partitions(self) -> None:
+        if not await BalanceHistory.is_partitioned():
+            return
+
+        now = timezone.now()
+        partitions = await BalanceHistory.get_partitions()
+        partition_start = partitions[-1][2] if partitions else BalanceHistory.get_partition_start(now)
+        last_partition_start = BalanceHistory.get_partition_start(now, variables.balance_history_partitions_ahead)
+        while partition_start <= last_partition_start:
+            name = await BalanceHistory.create_partition(partition_start)
+            logger.info(f"Created balance history partition {name}")
+            partition_start = BalanceHistory.get_partition_start(partition_start, 1)
+
+    async def apply_retention(self) -> None:
+        if balance_history_service.has_legacy_reasons or not await balance_history_service.is_rollup_backfilled():
+            return
+
+        cutoff = BalanceHistory.get_partition_start(timezone.now(), -variables.balance_history_retention_months)
+        for name, _, partition_end in await BalanceHistory.get_partitions():
+            if partition_end <= cutoff:
+                await self._archive_partition(name)
+
+    async def _archive_partition(self, name: str) -> None:
+        started_at = time.perf_counter()
+        path = os.path.join(self.archive_dir, name)
+        temp_path = f"{path}.tmp"
+        await asyncio.to_thread(self._reset_dir, temp_path)
+
+        last_id, chunk_index, row_count = 0, 0, 0
+        while True:
+            rows = await BalanceHistory.get_partition_rows(name, last_id, variables.balance_archive_chunk_size)
+            if not rows:
+                break
+
+            arrays = {
+                column: np.array([row[column] for row in rows], dtype=dtype)
+                for column, dtype in self.columns.items()
+            }
+            arrays["range"] = np.array([arrays["timestamp"].min(), arrays["timestamp"].max() + 1], dtype=np.int64)
+            arrays["user_ids"] = np.unique(arrays["user_id"])
+            await asyncio.to_thread(self._write_chunk, os.path.join(temp_path, f"{chunk_index:06d}.npz"), arrays)
+            last_id = rows[-1]["id"]
+            chunk_index += 1
+            row_count += len(rows)
+
+        await asyncio.to_thread(self._publish_dir, temp_path, path)
+        await BalanceHistory.drop_partition(name)
+        self._archives = None
+        size = sum(os.path.getsize(chunk_path) for chunk_path in glob.glob(os.path.join(path, "*.npz")))
+        logger.info(
+            f"Archived balance history partition {name}: {row_count} rows in {chunk_index} chunks, "
+            f"{size / 1024 / 1024:.1f}MiB in {time.perf_counter() - started_at:.1f}s"
+        )
+
+    @staticmethod
+    def _reset_dir(path: str) -> None:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+
+    @staticmethod
+    def _publish_dir(temp_path: str, path: str) -> None:
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def _write_chunk(path: str, arrays: Dict[str, np.ndarray]) -> None:
+        with open(path, "wb") as file:
+            np.savez_compressed(file, **arrays)
+
+    def _scan_archives(self) -> Dict[str, Tuple[int, int, FrozenSet[int]]]:
+        archives = {}
+        for path in sorted(glob.glob(os.path.join(self.archive_dir, "*", "*.npz"))):
+            if os.path.dirname(path).endswith(".tmp"):
+                continue
+            with np.load(path) as archive:
+                archive_range = archive["range"]
+                archives[path] = (int(archive_range[0]), int(archive_range[1]), frozenset(archive["user_ids"].tolist()))
+        return archives
+
+    def _read_user_history(self, paths: List[str], user_pk: int, start: int, end: int) -> Dict[str, np.ndarray]:
+        chunks: Dict[str, List[np.ndarray]] = {column: [] for column in self.columns}
+        for path in paths:
+            with np.load(path) as archive:
+                timestamps = archive["timestamp"]
+                mask = (archive["user_id"] == user_pk) & (timestamps >= start) & (timestamps < end)
+                for column in self.columns:
+                    chunks[column].append(archive[column][mask])
+
+        history = {
+            column: np.concatenate(chunks[column]) if chunks[column] else np.array([], dtype=dtype)
+            for column, dtype in self.columns.items()
+        }
+        order = np.lexsort((history["id"], history["timestamp"]))
+        return {column: values[order] for column, values in history.items()}
+
+    async def read_user_history(
+            self, user_pk: int, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> Dict[str, np.ndarray]:
+        if self._archives is None:
+            self._archives = await asyncio.to_thread(self._scan_archives)
+
+        start_us = self._to_epoch_microseconds(start) if start else np.iinfo(np.int64).min
+        end_us = self._to_epoch_microseconds(end) if end else np.iinfo(np.int64).max
+        paths = [
+            path for path, (range_start, range_end, user_ids) in self._archives.items()
+            if range_start < end_us and range_end > start_us and user_pk in user_ids
+        ]
+        return await asyncio.to_thread(self._read_user_history, paths, user_pk, start_us, end_us)
+
+    async def get_last_balance_before(self, user_pk: int, before: datetime) -> Optional[int]:
+        history = await self.read_user_history(user_pk, end=before)
+        if not history["new_balance"].size:
+            return None
+        return int(history["new_balance"][-1])
+
+
+balance_archive_service = BalanceArchiveService()
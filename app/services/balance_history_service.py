@@ -0,0 +1,366 @@
+import asyncio
+import re
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from cachetools import LRUCache
+from tortoise import timezone
+from tortoise.transactions import in_transaction
+
+from app.config import logger
+from app.core.enums import BalanceReason
+from app.core.models import (
+    User as UserModel,
+    BalanceHistory,
+    BalanceRollup,
+    BalanceRollupDaily,
+    BalanceRollupHourly,
+    Counter
+)
+from app.core.schemas import BalanceHistoryEntry, BalanceHistoryWriterStats, BalanceRollupEntry
+from app.core.variables import variables
+from app.localization import t
+
+
+class BalanceHistoryService:
+    rollup_models: Tuple[Type[BalanceRollup], ...] = (BalanceRollupHourly, BalanceRollupDaily)
+    rollup_snapshot_counter = "balance_rollups_snapshot"
+    rollup_progress_counter = "balance_rollups_backfill_progress"
+    rollup_done_counter = "balance_rollups_backfilled"
+    transfer_reasons = (BalanceReason.TRANSFER_SENT, BalanceReason.TRANSFER_RECEIVED)
+
+    def __init__(self):
+        self._queue: asyncio.Queue[BalanceHistoryEntry] = asyncio.Queue(
+            maxsize=variables.balance_history_queue_size
+        )
+        self._worker: Optional[asyncio.Task] = None
+        self._migrations: Optional[asyncio.Task] = None
+        self._partitioning_done = asyncio.Event()
+        self._stats = BalanceHistoryWriterStats()
+        self._flush_lock = asyncio.Lock()
+        self._rollup_snapshot_id: Optional[int] = None
+        self._has_legacy_reasons: Optional[bool] = None
+        self._watermarks: LRUCache[int, int] = LRUCache(maxsize=variables.balance_history_watermark_cache_size)
+        self._legacy_reason_patterns = self._build_legacy_reason_patterns()
+
+    def is_transfer(self, reason: BalanceReason) -> bool:
+        return reason in self.transfer_reasons
+
+    @property
+    def has_legacy_reasons(self) -> bool:
+        return self._has_legacy_reasons is not False
+
+    async def get_watermark(self, user_pk: int) -> int:
+        watermark = self._watermarks.get(user_pk)
+        if watermark is None:
+            last_ids = await BalanceHistory.filter(user_id=user_pk).order_by("-timestamp", "-id").limit(1).values_list(
+                "id", flat=True
+            )
+            watermark = max(self._watermarks.get(user_pk, 0), last_ids[0] if last_ids else 0)
+            self._watermarks[user_pk] = watermark
+        return watermark
+
+    @staticmethod
+    def _build_legacy_reason_patterns() -> List[Tuple[re.Pattern, BalanceReason]]:
+        patterns = []
+        for reason in BalanceReason:
+            if reason is BalanceReason.UNKNOWN:
+                continue
+            pattern = re.sub(r"\\\{(\w+)\\}", r"(?P<\1>.+?)", re.escape(t(reason.locale_key)))
+            patterns.append((re.compile(pattern, re.DOTALL), reason))
+        return sorted(patterns, key=lambda item: item[0].groups)
+
+    def parse_legacy_reason(self, text: str) -> Tuple[BalanceReason, Optional[Dict[str, Any]]]:
+        for pattern, reason in self._legacy_reason_patterns:
+            match = pattern.fullmatch(text)
+            if match:
+                params = {
+                    name: int(value) if value.isdigit() else value
+                    for name, value in match.groupdict().items()
+                }
+                return reason, params or None
+        return BalanceReason.UNKNOWN, {"text": text}
+
+    def start(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is None:
+            return
+
+        logger.info(f"Draining balance history queue ({self._queue.qsize()} pending)..")
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=variables.balance_history_drain_timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Balance history drain timed out, {self._queue.qsize()} entries were not saved")
+
+        self._worker.cancel()
+        self._worker = None
+
+    async def enqueue(
+            self, user_id: int, amount: int, new_balance: int, reason: BalanceReason,
+            reason_params: Optional[Dict[str, Any]] = None
+    ) -> None:
+        self.start()
+        entry = BalanceHistoryEntry(
+            user_id=user_id,
+            change_amount=amount,
+            new_balance=new_balance,
+            reason=reason,
+            reason_params=reason_params,
+            timestamp=timezone.now(),
+        )
+        if self._queue.full():
+            self._stats.backpressure_waits += 1
+        await self._queue.put(entry)
+        self._stats.max_queue_depth = max(self._stats.max_queue_depth, self._queue.qsize())
+
+    def get_stats(self) -> BalanceHistoryWriterStats:
+        self._stats.queue_depth = self._queue.qsize()
+        return self._stats
+
+    def log_stats(self) -> None:
+        stats = self.get_stats()
+        logger.info(
+            f"Balance history writer: {stats.flushed_rows} rows in {stats.flushes} flushes "
+            f"({stats.failed_rows} failed), flush latency avg {stats.average_flush_latency * 1000:.1f}ms "
+            f"max {stats.max_flush_latency * 1000:.1f}ms, queue depth {stats.queue_depth} "
+            f"(max {stats.max_queue_depth}, {stats.backpressure_waits} backpressure waits)"
+        )
+
+    async def _collect_batch(self) -> List[BalanceHistoryEntry]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + variables.balance_history_flush_interval
+
+        while len(batch) < variables.balance_history_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect_batch()
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _build_rollup_entries(
+            self, model: Type[BalanceRollup], records: List[BalanceHistory]
+    ) -> List[BalanceRollupEntry]:
+        rollups: Dict[Tuple[int, datetime], BalanceRollupEntry] = {}
+        for record in records:
+            bucket_start = model.get_bucket_start(record.timestamp)
+            gained = record.change_amount if record.change_amount > 0 and not self.is_transfer(record.reason) else 0
+            lost = -record.change_amount if record.change_amount < 0 and not self.is_transfer(record.reason) else 0
+
+            rollup = rollups.get((record.user_id, bucket_start))
+            if rollup is None:
+                rollups[(record.user_id, bucket_start)] = BalanceRollupEntry(
+                    user_pk=record.user_id,
+                    bucket_start=bucket_start,
+                    open_balance=record.new_balance,
+                    close_balance=record.new_balance,
+                    min_balance=record.new_balance,
+                    max_balance=record.new_balance,
+                    gained=gained,
+                    lost=lost,
+                    first_change_at=record.timestamp,
+                    last_change_at=record.timestamp,
+                )
+                continue
+
+            rollup.close_balance = record.new_balance
+            rollup.min_balance = min(rollup.min_balance, record.new_balance)
+            rollup.max_balance = max(rollup.max_balance, record.new_balance)
+            rollup.gained += gained
+            rollup.lost += lost
+            rollup.last_change_at = record.timestamp
+        return sorted(rollups.values(), key=lambda rollup: (rollup.user_pk, rollup.bucket_start))
+
+    @staticmethod
+    async def _get_max_history_id() -> int:
+        ids = await BalanceHistory.all().order_by("-id").limit(1).values_list("id", flat=True)
+        return ids[0] if ids else 0
+
+    async def _ensure_rollup_snapshot(self) -> int:
+        if self._rollup_snapshot_id is None:
+            counter, _ = await Counter.get_or_create(
+                name=self.rollup_snapshot_counter,
+                defaults={"value": await self._get_max_history_id()}
+            )
+            self._rollup_snapshot_id = counter.value
+        return self._rollup_snapshot_id
+
+    async def prepare_reason_migration(self) -> None:
+        try:
+            async with self._flush_lock:
+                self._has_legacy_reasons = await BalanceHistory.prepare_reason_migration()
+        except Exception as e:
+            logger.error(f"Failed to prepare balance history reason migration: {e}")
+
+    async def migrate_legacy_reasons(self) -> None:
+        if self._has_legacy_reasons is not True:
+            return
+
+        try:
+            logger.info("Converting legacy balance history reasons..")
+            started_at = time.perf_counter()
+            last_id, converted, unknown = 0, 0, 0
+            while True:
+                rows = await BalanceHistory.get_legacy_reasons(
+                    last_id, variables.balance_history_reason_migration_chunk_size
+                )
+                if not rows:
+                    break
+
+                parsed = [self.parse_legacy_reason(row["legacy_reason"]) for row in rows]
+                await BalanceHistory.convert_legacy_reasons(
+                    [row["id"] for row in rows],
+                    [reason for reason, _ in parsed],
+                    [params for _, params in parsed]
+                )
+                last_id = rows[-1]["id"]
+                converted += len(rows)
+                unknown += sum(reason is BalanceReason.UNKNOWN for reason, _ in parsed)
+
+            await BalanceHistory.finish_reason_migration()
+            self._has_legacy_reasons = False
+            logger.info(
+                f"Converted {converted} balance history reasons ({unknown} unrecognized) "
+                f"in {time.perf_counter() - started_at:.1f}s"
+            )
+        except Exception as e:
+            logger.error(f"Failed to convert legacy balance history reasons: {e}")
+
+    async def partition_history(self) -> None:
+        try:
+            if await BalanceHistory.is_partitioned():
+                return
+
+            boundary = BalanceHistory.get_partition_start(timezone.now(), 1)
+            logger.info("Converting balance history to a partitioned table..")
+            started_at = time.perf_counter()
+            await BalanceHistory.prepare_partitioning(boundary)
+            async with self._flush_lock:
+                locked_at = time.perf_counter()
+                await BalanceHistory.convert_to_partitioned(boundary)
+                locked_for = time.perf_counter() - locked_at
+            logger.info(
+                f"Balance history partitioned in {time.perf_counter() - started_at:.1f}s "
+                f"(table locked and writes paused for {locked_for:.2f}s)"
+            )
+        except Exception as e:
+            logger.error(f"Failed to partition balance history: {e}")
+
+    async def wait_for_partitioning(self) -> None:
+        await self._partitioning_done.wait()
+
+    def start_migrations(self) -> None:
+        if self._migrations is None:
+            self._migrations = asyncio.create_task(self.run_migrations())
+
+    async def run_migrations(self) -> None:
+        await self.prepare_reason_migration()
+        self.start()
+        if self._has_legacy_reasons is not None:
+            await self.partition_history()
+        self._partitioning_done.set()
+        await self.migrate_legacy_reasons()
+        if not self.has_legacy_reasons:
+            await self.backfill_rollups()
+
+    async def is_rollup_backfilled(self) -> bool:
+        return await Counter.filter(name=self.rollup_done_counter).exists()
+
+    async def backfill_rollups(self) -> None:
+        try:
+            if await self.is_rollup_backfilled():
+                return
+
+            async with self._flush_lock:
+                snapshot_id = await self._ensure_rollup_snapshot()
+            progress, _ = await Counter.get_or_create(name=self.rollup_progress_counter, defaults={"value": 0})
+            logger.info(f"Backfilling balance rollups up to history id {snapshot_id} from user pk {progress.value}..")
+
+            started_at = time.perf_counter()
+            last_user_pk, rollup_rows = progress.value, 0
+            while True:
+                user_pks = await UserModel.filter(id__gt=last_user_pk).order_by("id").limit(
+                    variables.balance_rollup_backfill_chunk_size
+                ).values_list("id", flat=True)
+                if not user_pks:
+                    break
+
+                async with self._flush_lock, in_transaction() as conn:
+                    for model in self.rollup_models:
+                        rollup_rows += await model.backfill(
+                            snapshot_id, user_pks[0], user_pks[-1], self.transfer_reasons, using_db=conn
+                        )
+                    await Counter.filter(name=self.rollup_progress_counter).using_db(conn).update(value=user_pks[-1])
+                last_user_pk = user_pks[-1]
+
+            await Counter.create(name=self.rollup_done_counter, value=snapshot_id)
+            logger.info(
+                f"Balance rollups backfilled: {rollup_rows} rollup rows in {time.perf_counter() - started_at:.1f}s"
+            )
+        except Exception as e:
+            logger.error(f"Failed to backfill balance rollups: {e}")
+
+    async def _flush(self, batch: List[BalanceHistoryEntry]) -> None:
+        started_at = time.perf_counter()
+        try:
+            user_pks = dict(
+                await UserModel.filter(
+                    user_id__in={entry.user_id for entry in batch}
+                ).values_list("user_id", "id")
+            )
+
+            records = []
+            for entry in batch:
+                user_pk = user_pks.get(entry.user_id)
+                if user_pk is None:
+                    logger.error(f"Failed to save balance history for user {entry.user_id}: user not found")
+                    self._stats.failed_rows += 1
+                    continue
+                records.append(BalanceHistory(
+                    user_id=user_pk,
+                    timestamp=entry.timestamp,
+                    change_amount=entry.change_amount,
+                    new_balance=entry.new_balance,
+                    reason=entry.reason,
+                    reason_params=entry.reason_params,
+                ))
+
+            if records:
+                async with self._flush_lock:
+                    await self._ensure_rollup_snapshot()
+                    async with in_transaction() as conn:
+                        await BalanceHistory.bulk_create(records, using_db=conn)
+                        last_id = await BalanceHistory.get_last_inserted_id(using_db=conn)
+                        for model in self.rollup_models:
+                            await model.apply_entries(self._build_rollup_entries(model, records), using_db=conn)
+                for user_pk in {record.user_id for record in records}:
+                    self._watermarks[user_pk] = last_id
+            self._stats.flushed_rows += len(records)
+            self._stats.flushes += 1
+        except Exception as e:
+            self._stats.failed_rows += len(batch)
+            logger.error(f"Failed to save a batch of {len(batch)} balance history entries: {e}")
+        finally:
+            latency = time.perf_counter() - started_at
+            self._stats.last_flush_latency = latency
+            self._stats.max_flush_latency = max(self._stats.max_flush_latency, latency)
+            self._stats.total_flush_latency += latency
+
+
+balance_history_service = BalanceHistoryService()
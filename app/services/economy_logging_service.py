@@ -1,13 +1,18 @@
 import asyncio
 import re
-from typing import Optional
+import time
+from typing import Any, Dict, List, Optional
 
-from disnake import User, Member, TextChannel
+from disnake import User, Member, TextChannel, HTTPException
 from disnake.ext.commands import InteractionBot
 
 from app.config import config, logger
-from app.core.models import User as UserModel, BalanceHistory
+from app.core.enums import BalanceReason
+from app.core.models import Counter
+from app.core.schemas import EconomyLogEntry, EconomyLogSenderStats
+from app.core.variables import variables
 from app.embeds import economy_embeds
+from app.services import balance_history_service
 from app.utils.response_utils import response_utils
 
 
@@ -16,35 +21,49 @@ class EconomyLoggingService:
         self._bot: Optional[InteractionBot] = None
         self._channel: Optional[TextChannel] = None
         self._counter: int = 0
+        self._block_end: int = 0
         self._lock = asyncio.Lock()
+        self._queue: asyncio.Queue[EconomyLogEntry] = asyncio.Queue(maxsize=variables.economy_log_queue_size)
+        self._sender: Optional[asyncio.Task] = None
+        self._send_interval: float = variables.economy_log_min_send_interval
+        self._stats = EconomyLogSenderStats()
 
     async def init_logging(self, bot: InteractionBot):
         logger.info("Starting economy logging initialization..")
         self._bot = bot
 
-        log_channel = await self._get_channel()
-        if not log_channel:
-            logger.warning("Log channel not found. Counter starts from 0")
-            return
-
-        async for message in log_channel.history(limit=100):
-            if message.author.id == self._bot.user.id and message.embeds:
-                footer_text = message.embeds[0].footer.text
-                if footer_text and footer_text.startswith("#"):
-                    try:
-                        last_id = int(re.search(r'\d+', footer_text).group())
-                        self._counter = last_id
-                        logger.info(f"Successfully loaded last log ID: {self._counter}")
-                        return
-                    except (ValueError, AttributeError):
-                        continue
+        if not await Counter.exists(name=variables.economy_log_counter_name):
+            await self._seed_counter_from_channel()
 
-        logger.info("No previous logs found in the channel. Counter starts from 0")
+    async def _seed_counter_from_channel(self) -> None:
+        last_id = 0
+        log_channel = await self._get_channel()
+        if log_channel:
+            async for message in log_channel.history(limit=100):
+                if message.author.id == self._bot.user.id and message.embeds:
+                    footer_text = message.embeds[-1].footer.text
+                    if footer_text and footer_text.startswith("#"):
+                        try:
+                            last_id = int(re.search(r'\d+', footer_text).group())
+                            break
+                        except (ValueError, AttributeError):
+                            continue
+
+        await Counter.get_or_create(name=variables.economy_log_counter_name, defaults={"value": last_id})
+        logger.info(f"Economy log counter seeded from the log channel, starting after #{last_id}")
 
     async def get_next(self) -> int:
         async with self._lock:
-            self._counter += 1
-            return self._counter
+            return await self._allocate_id()
+
+    async def _allocate_id(self) -> int:
+        if self._counter >= self._block_end:
+            block_size = variables.economy_log_counter_block_size
+            self._block_end = await Counter.allocate(variables.economy_log_counter_name, block_size)
+            self._counter = self._block_end - block_size
+
+        self._counter += 1
+        return self._counter
 
     async def _get_channel(self) -> Optional[TextChannel]:
         if self._channel is None:
@@ -60,46 +79,144 @@ class EconomyLoggingService:
                 logger.error(f"Channel with ID {config.economy_logging_channel_id} is not a TextChannel or not found!")
         return self._channel
 
-    @staticmethod
-    async def _save_balance_history(
-            user_id: int, amount: int, new_balance: int, reason: str
-    ) -> None:
+    def start(self) -> None:
+        if self._sender is None or self._sender.done():
+            self._sender = asyncio.create_task(self._run_sender())
+
+    async def stop(self) -> None:
+        if self._sender is None:
+            return
+
         try:
-            db_user = await UserModel.get(user_id=user_id)
-            await BalanceHistory.create(
-                user=db_user,
-                change_amount=amount,
-                new_balance=new_balance,
-                reason=reason,
+            await asyncio.wait_for(self._queue.join(), timeout=variables.economy_log_drain_timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Economy log drain timed out, {self._queue.qsize()} log messages were not sent")
+
+        self._sender.cancel()
+        self._sender = None
+
+    def get_stats(self) -> EconomyLogSenderStats:
+        self._stats.queue_depth = self._queue.qsize()
+        self._stats.send_interval = self._send_interval
+        return self._stats
+
+    def log_stats(self) -> None:
+        stats = self.get_stats()
+        logger.info(
+            f"Economy log sender: {stats.sent_embeds} embeds in {stats.sent_messages} messages, "
+            f"{stats.dropped_embeds} dropped, {stats.rate_limited} rate limited, "
+            f"send interval {stats.send_interval:.2f}s, send lag last {stats.last_send_lag:.2f}s "
+            f"max {stats.max_send_lag:.2f}s, queue depth {stats.queue_depth}"
+        )
+
+    def _enqueue(self, entry: EconomyLogEntry) -> None:
+        if self._queue.full():
+            self._queue.get_nowait()
+            self._queue.task_done()
+            self._stats.dropped_embeds += 1
+        self._queue.put_nowait(entry)
+
+    async def _collect_batch(self) -> List[EconomyLogEntry]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + variables.economy_log_coalesce_window
+
+        while len(batch) < variables.economy_log_embeds_per_message:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run_sender(self) -> None:
+        while True:
+            batch = await self._collect_batch()
+            try:
+                await self._send_batch(batch)
+            except Exception as e:
+                self._stats.dropped_embeds += len(batch)
+                logger.error(f"Failed to send {len(batch)} economy log embeds: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+            await asyncio.sleep(self._send_interval)
+
+    async def _send_batch(self, batch: List[EconomyLogEntry]) -> None:
+        log_channel = await self._get_channel()
+        if not log_channel:
+            self._stats.dropped_embeds += len(batch)
+            return
+
+        for _ in range(variables.economy_log_send_attempts):
+            try:
+                await response_utils.send_new_message(log_channel, embeds=[entry.embed for entry in batch])
+            except HTTPException as exception:
+                if exception.status != 429:
+                    logger.error(f"Failed to send {len(batch)} economy log embeds: {exception}")
+                    break
+                self._stats.rate_limited += 1
+                retry_after = self._get_retry_after(exception)
+                self._send_interval = min(
+                    max(self._send_interval * 2, retry_after), variables.economy_log_max_send_interval
+                )
+                logger.warning(f"Economy log channel is rate limited, retrying in {retry_after:.2f}s")
+                await asyncio.sleep(retry_after)
+                continue
+
+            lag = time.monotonic() - batch[0].enqueued_at
+            self._stats.sent_messages += 1
+            self._stats.sent_embeds += len(batch)
+            self._stats.last_send_lag = lag
+            self._stats.max_send_lag = max(self._stats.max_send_lag, lag)
+            self._send_interval = max(
+                self._send_interval * variables.economy_log_send_interval_decay,
+                variables.economy_log_min_send_interval
             )
-        except Exception as e:
-            logger.error(f"Failed to save balance history for user {user_id}: {e}")
+            return
+
+        self._stats.dropped_embeds += len(batch)
+
+    def _get_retry_after(self, exception: HTTPException) -> float:
+        headers = getattr(exception.response, "headers", None) or {}
+        for header in ("Retry-After", "X-RateLimit-Reset-After"):
+            try:
+                return float(headers[header])
+            except (KeyError, TypeError, ValueError):
+                continue
+        return self._send_interval
 
     async def log_balance_change(
-            self, user: User | Member, amount: int, new_balance: int, reason: str
+            self, user: User | Member, amount: int, new_balance: int, reason: BalanceReason,
+            reason_params: Optional[Dict[str, Any]] = None
     ) -> None:
         if not self._bot:
             return
 
-        asyncio.create_task(self._save_balance_history(user.id, amount, new_balance, reason))
+        await balance_history_service.enqueue(user.id, amount, new_balance, reason, reason_params)
 
         log_channel = await self._get_channel()
         if not log_channel:
             return
 
         user_mention = f"<@{user.id}>"
-        log_id = await self.get_next()
-
-        embed = await economy_embeds.format_balance_log_embed(
-            user_mention=user_mention,
-            avatar_url=user.display_avatar.url,
-            amount=amount,
-            new_balance=new_balance,
-            reason=reason,
-            log_id=log_id
-        )
 
-        await response_utils.send_new_message(log_channel, embed=embed)
+        async with self._lock:
+            log_id = await self._allocate_id()
+            embed = await economy_embeds.format_balance_log_embed(
+                user_mention=user_mention,
+                avatar_url=user.display_avatar.url,
+                amount=amount,
+                new_balance=new_balance,
+                reason=reason.render(reason_params),
+                log_id=log_id
+            )
+            self._enqueue(EconomyLogEntry(embed=embed, enqueued_at=time.monotonic()))
+
+        self.start()
 
 
 economy_logging_service = EconomyLoggingService()
@@ -1,41 +1,64 @@
 import asyncio
-from typing import Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 from disnake import User, Member, Embed
-from tortoise.expressions import Q
 from tortoise.transactions import in_transaction
 
+from app.core.enums import BalanceReason
 from app.core.models import User as UserModel
+from app.core.schemas import BalanceChangedEvent
 from app.embeds import economy_embeds
 from app.localization import t
-from app.services import achievement_handler_service, economy_logging_service
+from app.services import achievement_handler_service, economy_logging_service, rank_service
 
 
 class EconomyManagementService:
     @staticmethod
-    async def update_user_balance(user: User, amount: int, reason: str, balance_only: bool = False) -> None:
-        db_user, _ = await UserModel.get_or_create(user_id=user.id)
-
-        await db_user.update_balance(amount, balance_only)
+    async def update_user_balance(
+            user: User, amount: int, reason: BalanceReason, balance_only: bool = False,
+            reason_params: Optional[Dict[str, Any]] = None
+    ) -> None:
+        result = await UserModel.add_balance(user.id, amount, balance_only)
+        rank_service.update_balance(user.id, result.balance, result.reputation)
 
         asyncio.create_task(
             economy_logging_service.log_balance_change(
-                user=user, amount=amount, new_balance=db_user.balance, reason=reason
+                user=user, amount=amount, new_balance=result.balance, reason=reason, reason_params=reason_params
             )
         )
 
-        asyncio.create_task(achievement_handler_service.handle_economy_achievements(user))
+        asyncio.create_task(achievement_handler_service.handle_event(
+            BalanceChangedEvent(user, balance=result.balance, reputation=result.reputation)
+        ))
+
+    @staticmethod
+    async def settle_payouts(
+            payouts: List[Tuple[User | Member, int]], reason: BalanceReason, balance_only: bool = False
+    ) -> None:
+        users: Dict[int, User | Member] = {}
+        changes: Dict[int, int] = {}
+        for user, amount in payouts:
+            users[user.id] = user
+            changes[user.id] = changes.get(user.id, 0) + amount
+
+        results = await UserModel.add_balances(changes, balance_only)
+
+        for user_id, result in results.items():
+            user = users[user_id]
+            rank_service.update_balance(user_id, result.balance, result.reputation)
+            asyncio.create_task(
+                economy_logging_service.log_balance_change(
+                    user=user, amount=changes[user_id], new_balance=result.balance, reason=reason
+                )
+            )
+            asyncio.create_task(achievement_handler_service.handle_event(
+                BalanceChangedEvent(user, balance=result.balance, reputation=result.reputation)
+            ))
 
     @staticmethod
     async def create_user_balance_message(user: User) -> Embed:
         db_user, is_created = await UserModel.get_or_create(user_id=user.id)
-        higher_ranking_users_count = (
-            await UserModel.filter(
-                Q(reputation__gt=db_user.reputation)
-                | Q(reputation=db_user.reputation, user_id__lt=db_user.user_id)
-            ).count()
-        )
-        position = higher_ranking_users_count + 1
+        position = await rank_service.get_rank("reputation", db_user.user_id, db_user.reputation)
 
         return await economy_embeds.format_balance_embed(
             user.display_avatar.url, db_user.balance, db_user.reputation, position
@@ -44,6 +67,7 @@ class EconomyManagementService:
     @staticmethod
     async def reset_users_reputation() -> None:
         await UserModel.all().update(reputation=0)
+        rank_service.reset_scores("reputation")
 
     @staticmethod
     async def transfer_balance(sender: User | Member, receiver: User | Member, amount: int) -> Tuple[bool, str]:
@@ -57,24 +81,24 @@ class EconomyManagementService:
             return False, t("errors.transfer_amount_must_be_positive")
 
         async with in_transaction():
-            db_sender, _ = await UserModel.get_or_create(user_id=sender.id)
-            if db_sender.balance < amount:
-                return False, t("errors.insufficient_funds_for_transfer", balance=db_sender.balance)
-
-            db_receiver, _ = await UserModel.get_or_create(user_id=receiver.id)
+            sender_result = await UserModel.withdraw_balance(sender.id, amount)
+            if sender_result is None:
+                db_sender = await UserModel.get_or_none(user_id=sender.id)
+                balance = db_sender.balance if db_sender else 0
+                return False, t("errors.insufficient_funds_for_transfer", balance=balance)
 
-            db_sender.balance -= amount
-            await db_sender.save(update_fields=["balance"])
+            receiver_result = await UserModel.add_balance(receiver.id, amount, balance_only=True)
 
-            db_receiver.balance += amount
-            await db_receiver.save(update_fields=["balance"])
+        rank_service.update_balance(sender.id, sender_result.balance, sender_result.reputation)
+        rank_service.update_balance(receiver.id, receiver_result.balance, receiver_result.reputation)
 
         asyncio.create_task(
             economy_logging_service.log_balance_change(
                 user=sender,
                 amount=-amount,
-                new_balance=db_sender.balance,
-                reason=t("economy.reasons.transfer_sent", user_id=receiver.id),
+                new_balance=sender_result.balance,
+                reason=BalanceReason.TRANSFER_SENT,
+                reason_params={"user_id": receiver.id},
             )
         )
 
@@ -82,13 +106,18 @@ class EconomyManagementService:
             economy_logging_service.log_balance_change(
                 user=receiver,
                 amount=amount,
-                new_balance=db_receiver.balance,
-                reason=t("economy.reasons.transfer_received", user_id=sender.id),
+                new_balance=receiver_result.balance,
+                reason=BalanceReason.TRANSFER_RECEIVED,
+                reason_params={"user_id": sender.id},
             )
         )
 
-        asyncio.create_task(achievement_handler_service.handle_economy_achievements(sender, amount_transferred=amount))
-        asyncio.create_task(achievement_handler_service.handle_economy_achievements(receiver))
+        asyncio.create_task(achievement_handler_service.handle_event(BalanceChangedEvent(
+            sender, balance=sender_result.balance, reputation=sender_result.reputation, amount_transferred=amount
+        )))
+        asyncio.create_task(achievement_handler_service.handle_event(BalanceChangedEvent(
+            receiver, balance=receiver_result.balance, reputation=receiver_result.reputation
+        )))
 
         return True, t("responses.transfer_success", amount=amount, user_id=receiver.id)
 
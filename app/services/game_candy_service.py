@@ -6,9 +6,10 @@ import random
 from disnake import ui, ApplicationCommandInteraction, MessageInteraction
 
 from app.config import config
+from app.core.enums import BalanceReason
+from app.core.schemas import GameFinishedEvent
 from app.core.variables import variables
 from app.embeds import games_embeds
-from app.localization import t
 from app.services import achievement_handler_service, economy_management_service
 from app.utils.response_utils import response_utils
 from app.views.games_views import CandyGameView
@@ -90,9 +91,9 @@ class CandyGameService:
             loss_embed = await games_embeds.format_candy_loss_embed(bet=bet)
             await response_utils.edit_response(interaction, embed=loss_embed, view=None)
             asyncio.create_task(
-                achievement_handler_service.handle_candy_achievements(
-                    interaction.user, player_taken, is_loss=True
-                )
+                achievement_handler_service.handle_event(GameFinishedEvent(
+                    interaction.user, game="candy", is_loss=True, player_taken=player_taken
+                ))
             )
             return
 
@@ -119,13 +120,15 @@ class CandyGameService:
         winnings = int(bet * multiplier)
 
         await economy_management_service.update_user_balance(
-            interaction.user, winnings, t("economy.reasons.game_win_candy")
+            interaction.user, winnings, BalanceReason.GAME_WIN_CANDY
         )
         win_embed = await games_embeds.format_candy_win_embed(winnings=winnings)
         await response_utils.edit_response(interaction, embed=win_embed, view=None)
 
         asyncio.create_task(
-            achievement_handler_service.handle_candy_achievements(interaction.user, player_taken, is_loss=False)
+            achievement_handler_service.handle_event(
+                GameFinishedEvent(interaction.user, game="candy", player_taken=player_taken)
+            )
         )
 
 
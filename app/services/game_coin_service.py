@@ -3,8 +3,9 @@ import random
 
 from disnake import ApplicationCommandInteraction
 
+from app.core.enums import BalanceReason
+from app.core.schemas import GameFinishedEvent
 from app.embeds import games_embeds
-from app.localization import t
 from app.services import achievement_handler_service, economy_management_service
 from app.utils.response_utils import response_utils
 
@@ -17,10 +18,12 @@ class CoinFlipService:
         if is_win:
             winnings = bet * 2
             await economy_management_service.update_user_balance(
-                interaction.user, winnings, t("economy.reasons.game_win_coin")
+                interaction.user, winnings, BalanceReason.GAME_WIN_COIN
             )
             embed = await games_embeds.format_coin_flip_win_embed(bet=winnings)
-            asyncio.create_task(achievement_handler_service.handle_coin_flip_achievements(interaction.user, winnings))
+            asyncio.create_task(achievement_handler_service.handle_event(
+                GameFinishedEvent(interaction.user, game="coin_flip", winnings=winnings)
+            ))
         else:
             embed = await games_embeds.format_coin_flip_loss_embed(bet=bet)
 
@@ -3,10 +3,10 @@ import random
 
 from disnake import ui, ApplicationCommandInteraction, MessageInteraction
 
-from app.core.schemas import CoguardState
+from app.core.enums import BalanceReason
+from app.core.schemas import CoguardState, GameFinishedEvent
 from app.core.variables import variables
 from app.embeds import games_embeds
-from app.localization import t
 from app.services import achievement_handler_service, economy_management_service
 from app.utils.response_utils import response_utils
 from app.views.games_views import CoguardView
@@ -55,7 +55,9 @@ class CoguardService:
             loss_embed = await games_embeds.format_coguard_loss_embed(state.bet, state.win_streak)
             await response_utils.edit_response(interaction, embed=loss_embed, view=None)
             asyncio.create_task(
-                achievement_handler_service.handle_coguard_achievements(interaction.user, state, is_loss=True)
+                achievement_handler_service.handle_event(GameFinishedEvent(
+                    interaction.user, game="coguard", is_loss=True, win_streak=state.win_streak
+                ))
             )
             return
 
@@ -79,7 +81,7 @@ class CoguardService:
         winnings = int(winnings_label.split(" ")[1])
 
         await economy_management_service.update_user_balance(
-            interaction.user, winnings, t("economy.reasons.game_win_coguard")
+            interaction.user, winnings, BalanceReason.GAME_WIN_COGUARD
         )
 
         state = self._parse_state_from_components(interaction.message.components)
@@ -91,7 +93,13 @@ class CoguardService:
         )
         await response_utils.edit_response(interaction, embed=win_embed, view=None)
         asyncio.create_task(
-            achievement_handler_service.handle_coguard_achievements(interaction.user, state, is_loss=False)
+            achievement_handler_service.handle_event(GameFinishedEvent(
+                interaction.user,
+                game="coguard",
+                winnings=winnings,
+                multiplier=state.multiplier,
+                win_streak=state.win_streak
+            ))
         )
 
 
@@ -3,10 +3,10 @@ import random
 
 from disnake import ApplicationCommandInteraction, ui, MessageInteraction
 
-from app.core.schemas import CrystallizationState
+from app.core.enums import BalanceReason
+from app.core.schemas import CrystallizationState, GameFinishedEvent
 from app.core.variables import variables
 from app.embeds import games_embeds
-from app.localization import t
 from app.services import achievement_handler_service, economy_management_service
 from app.utils.response_utils import response_utils
 from app.views.games_views import CrystallizationView
@@ -46,9 +46,9 @@ class CrystallizationService:
             loss_embed = await games_embeds.format_crystallize_loss_embed(state.bet)
             await response_utils.edit_response(interaction, embed=loss_embed, view=None)
             asyncio.create_task(
-                achievement_handler_service.handle_crystallization_achievements(
-                    interaction.user, state, is_loss=True
-                )
+                achievement_handler_service.handle_event(GameFinishedEvent(
+                    interaction.user, game="crystallization", is_loss=True, multiplier=state.multiplier
+                ))
             )
             return
 
@@ -78,7 +78,7 @@ class CrystallizationService:
         winnings = int(winnings_label.split(" ")[1])
 
         await economy_management_service.update_user_balance(
-            interaction.user, winnings, t("economy.reasons.game_win_crystallization")
+            interaction.user, winnings, BalanceReason.GAME_WIN_CRYSTALLIZATION
         )
 
         state = self._parse_state_from_components(interaction.message.components)
@@ -87,9 +87,9 @@ class CrystallizationService:
         )
         await response_utils.edit_response(interaction, embed=win_embed, view=None)
         asyncio.create_task(
-            achievement_handler_service.handle_crystallization_achievements(
-                interaction.user, state, is_loss=False
-            )
+            achievement_handler_service.handle_event(GameFinishedEvent(
+                interaction.user, game="crystallization", multiplier=state.multiplier
+            ))
         )
 
 
@@ -3,7 +3,8 @@ import random
 
 from disnake import ApplicationCommandInteraction, TextChannel
 
-from app.core.schemas import HoleGameState, HolePlayerBet
+from app.core.enums import BalanceReason
+from app.core.schemas import GameFinishedEvent, HoleGameState, HolePlayerBet
 from app.core.variables import variables
 from app.embeds import games_embeds
 from app.localization import t
@@ -31,7 +32,7 @@ class HoleGameService:
 
         if any(p_bet.player.id == player.id for p_bet in game_state.bets):
             await economy_management_service.update_user_balance(
-                player, bet, t("economy.reasons.hole_game_bet_refund")
+                player, bet, BalanceReason.HOLE_GAME_BET_REFUND
             )
             await response_utils.send_response(
                 interaction, t("responses.games.hole.already_bet"), delete_after=10
@@ -71,22 +72,24 @@ class HoleGameService:
         game_state_to_process = self.games.pop(channel_id)
         winning_number = random.randint(0, 36)
         winning_item_name = variables.hole_items[winning_number]
-        winners = []
+        winning_bets = []
         for p_bet in game_state_to_process.bets:
             bet_option = variables.hole_bet_options.get(p_bet.choice)
             if bet_option and winning_number in bet_option["numbers"]:
-                payout = p_bet.amount * bet_option["multiplier"]
-                await economy_management_service.update_user_balance(
-                    p_bet.player, payout, t("economy.reasons.game_win_hole")
-                )
-                winners.append((p_bet.player, payout))
-
-                is_jackpot = bet_option["multiplier"] == 36
-                is_o5_win = winning_number == 0
-
-                asyncio.create_task(
-                    achievement_handler_service.handle_hole_achievements(p_bet.player, is_jackpot, is_o5_win, payout)
-                )
+                winning_bets.append((p_bet, bet_option["multiplier"], p_bet.amount * bet_option["multiplier"]))
+
+        winners = [(p_bet.player, payout) for p_bet, _, payout in winning_bets]
+        await economy_management_service.settle_payouts(winners, BalanceReason.GAME_WIN_HOLE)
+
+        for p_bet, multiplier, payout in winning_bets:
+            is_jackpot = multiplier == 36
+            is_o5_win = winning_number == 0
+
+            asyncio.create_task(
+                achievement_handler_service.handle_event(GameFinishedEvent(
+                    p_bet.player, game="hole", winnings=payout, is_jackpot=is_jackpot, is_o5_win=is_o5_win
+                ))
+            )
 
         result_embed = await games_embeds.format_hole_results_embed(
             winning_item=winning_item_name, winners=winners
@@ -4,6 +4,7 @@ from typing import Dict
 
 from disnake import ApplicationCommandInteraction, MessageInteraction, Message
 
+from app.core.enums import BalanceReason
 from app.core.schemas import SchrodingerGameState
 from app.core.variables import variables
 from app.embeds import games_embeds
@@ -81,7 +82,7 @@ class SchrodingerGameService:
         if is_win:
             winnings = int(game_state.bet * multiplier)
             await economy_management_service.update_user_balance(
-                interaction.user, winnings, t("economy.reasons.game_win_schrodinger")
+                interaction.user, winnings, BalanceReason.GAME_WIN_SCHRODINGER
             )
             embed = await games_embeds.format_schrodinger_win_embed(winnings, final_choice_index, not was_switched)
         else:
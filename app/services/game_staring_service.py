@@ -4,8 +4,9 @@ from typing import Dict
 
 from disnake import ApplicationCommandInteraction, MessageInteraction, TextChannel, User
 
+from app.core.enums import BalanceReason
 from app.core.models import User as UserModel
-from app.core.schemas import SCP173GameState
+from app.core.schemas import GameFinishedEvent, SCP173GameState
 from app.core.variables import variables
 from app.embeds import games_embeds
 from app.localization import t
@@ -40,7 +41,7 @@ class StaringGameService:
             await economy_management_service.update_user_balance(
                 current_state.host,
                 current_state.bet,
-                t("economy.reasons.staring_game_not_enough_players_refund"),
+                BalanceReason.STARING_GAME_NOT_ENOUGH_PLAYERS_REFUND,
                 balance_only=True
             )
             message_to_edit = await interaction.original_message()
@@ -80,7 +81,7 @@ class StaringGameService:
         await economy_management_service.update_user_balance(
             user,
             -game_state.bet,
-            t("economy.reasons.staring_game_bet"),
+            BalanceReason.STARING_GAME_BET,
             balance_only=True
         )
         game_state.players.append(user)
@@ -120,12 +121,9 @@ class StaringGameService:
         await response_utils.edit_message(message, embed=start_embed, view=info_view)
 
         asyncio.create_task(
-            achievement_handler_service.handle_scp173_achievements(
-                game_state.host,
-                is_host=True,
-                is_survivor=False,
-                is_first_death=False
-            )
+            achievement_handler_service.handle_event(GameFinishedEvent(
+                game_state.host, game="scp173", is_host=True
+            ))
         )
         await asyncio.sleep(3)
 
@@ -159,12 +157,9 @@ class StaringGameService:
                         t("responses.games.staring.round_log_death", player_mention=player.mention))
                     if round_number == 1:
                         asyncio.create_task(
-                            achievement_handler_service.handle_scp173_achievements(
-                                player,
-                                is_host=False,
-                                is_survivor=False,
-                                is_first_death=True
-                            )
+                            achievement_handler_service.handle_event(GameFinishedEvent(
+                                player, game="scp173", is_first_death=True
+                            ))
                         )
                 else:
                     current_round_log.append(
@@ -209,21 +204,16 @@ class StaringGameService:
             await self._handle_single_winner(channel, survivors[0], pot)
         else:
             winnings_per_player = pot // len(survivors)
+            await economy_management_service.settle_payouts(
+                [(winner, winnings_per_player) for winner in survivors],
+                BalanceReason.GAME_WIN_STARING,
+                balance_only=True
+            )
             for winner in survivors:
-                await economy_management_service.update_user_balance(
-                    winner,
-                    winnings_per_player,
-                    t("economy.reasons.game_win_staring"),
-                    balance_only=True
-                )
                 asyncio.create_task(
-                    achievement_handler_service.handle_scp173_achievements(
-                        winner,
-                        is_host=False,
-                        is_survivor=True,
-                        is_first_death=False,
-                        pot=winnings_per_player
-                    )
+                    achievement_handler_service.handle_event(GameFinishedEvent(
+                        winner, game="scp173", winnings=winnings_per_player, is_survivor=True
+                    ))
                 )
             embed = await games_embeds.format_scp173_multiple_winners_embed(survivors, winnings_per_player)
             await response_utils.send_new_message(channel, embed=embed)
@@ -240,17 +230,13 @@ class StaringGameService:
         await economy_management_service.update_user_balance(
             winner,
             pot,
-            t("economy.reasons.game_win_staring"),
+            BalanceReason.GAME_WIN_STARING,
             balance_only=True
         )
         asyncio.create_task(
-            achievement_handler_service.handle_scp173_achievements(
-                winner,
-                is_host=False,
-                is_survivor=True,
-                is_first_death=False,
-                pot=pot
-            )
+            achievement_handler_service.handle_event(GameFinishedEvent(
+                winner, game="scp173", winnings=pot, is_survivor=True
+            ))
         )
         embed = await games_embeds.format_scp173_single_winner_embed(winner, pot)
         await response_utils.send_new_message(channel, embed=embed)
@@ -1,22 +1,19 @@
 import asyncio
 import io
 import random
-from pathlib import Path
 
-from PIL import Image
+from cachetools import LRUCache
 from disnake import ApplicationCommandInteraction, Colour, File, MediaGalleryItem, MessageInteraction, SeparatorSpacing, ui
 
-from app.core.enums import Color
-from app.core.schemas import TwentyOneCard, TwentyOneGameState
+from app.core.enums import BalanceReason, Color
+from app.core.schemas import CardStripRenderJob, TwentyOneCard, TwentyOneGameState
 from app.core.variables import variables
 from app.localization import t
-from app.services import economy_management_service
+from app.services import economy_management_service, render_service
 from app.views.games_views import TwentyOneView
 
 
 class TwentyOneService:
-    card_image_width = 96
-    card_gap = 8
     result_colors = {
         "win": Color.GREEN,
         "tie": Color.YELLOW,
@@ -25,6 +22,9 @@ class TwentyOneService:
 
     def __init__(self):
         self.games: dict[int, TwentyOneGameState] = {}
+        self.strip_cache: LRUCache[tuple[str, ...], bytes] = LRUCache(
+            maxsize=variables.card_strip_cache_budget, getsizeof=len
+        )
 
     @staticmethod
     def _create_deck() -> list[TwentyOneCard]:
@@ -49,47 +49,19 @@ class TwentyOneService:
         return score
 
     @staticmethod
-    def _card_path(card: TwentyOneCard) -> Path:
-        filename = variables.twenty_one["card_filename"].format(rank=card.rank, suit=card.suit)
-        return Path(variables.playing_cards_dir_path) / filename
-
-    @staticmethod
-    def _backside_path() -> Path:
-        return Path(variables.playing_cards_dir_path) / variables.twenty_one["backside_filename"]
-
-    @staticmethod
-    def _make_images_file(paths: list[Path], filename: str) -> File:
-        width = TwentyOneService.card_image_width
-        gap = TwentyOneService.card_gap
-        images = []
-        for path in paths:
-            image = Image.open(path).convert("RGBA")
-            height = round(image.height * width / image.width)
-            images.append(image.resize((width, height), Image.Resampling.LANCZOS))
-
-        strip = Image.new(
-            "RGBA",
-            (width * len(images) + gap * (len(images) - 1), max(image.height for image in images)),
-            (0, 0, 0, 0),
-        )
-        offset = 0
-        for image in images:
-            strip.alpha_composite(image, (offset, 0))
-            offset += width + gap
-
-        stream = io.BytesIO()
-        strip.save(stream, format="PNG")
-        stream.seek(0)
-        return File(stream, filename=filename)
-
-    @staticmethod
-    def _make_cards_file(cards: list[TwentyOneCard], filename: str) -> File:
-        return TwentyOneService._make_images_file(
-            [TwentyOneService._card_path(card) for card in cards], filename
-        )
-
-    @staticmethod
-    def _build_components(
+    def _card_filename(card: TwentyOneCard) -> str:
+        return variables.twenty_one["card_filename"].format(rank=card.rank, suit=card.suit)
+
+    async def _make_strip_file(self, filenames: list[str], filename: str) -> File:
+        cache_key = tuple(filenames)
+        image_bytes = self.strip_cache.get(cache_key)
+        if image_bytes is None:
+            image_bytes = await render_service.render(CardStripRenderJob(filenames=filenames))
+            self.strip_cache[cache_key] = image_bytes
+        return File(io.BytesIO(image_bytes), filename=filename)
+
+    async def _build_components(
+            self,
             state: TwentyOneGameState,
             reveal_dealer: bool = False,
             view: ui.View | None = None,
@@ -100,16 +72,16 @@ class TwentyOneService:
         dealer_upcard = dealer_cards[variables.twenty_one["dealer_upcard_index"]]
         player_score = TwentyOneService._score(cards)
         dealer_score = TwentyOneService._score(dealer_cards) if reveal_dealer else dealer_upcard.value
-        files = [
-            TwentyOneService._make_cards_file(cards, "twenty_one_player.png"),
-            TwentyOneService._make_images_file(
-                ([TwentyOneService._backside_path()] + [TwentyOneService._card_path(
-                    dealer_cards[variables.twenty_one["dealer_upcard_index"]]
-                )])
-                if not reveal_dealer else [TwentyOneService._card_path(card) for card in dealer_cards],
+        files = list(await asyncio.gather(
+            self._make_strip_file(
+                [TwentyOneService._card_filename(card) for card in cards], "twenty_one_player.png"
+            ),
+            self._make_strip_file(
+                [variables.twenty_one["backside_filename"], TwentyOneService._card_filename(dealer_upcard)]
+                if not reveal_dealer else [TwentyOneService._card_filename(card) for card in dealer_cards],
                 "twenty_one_dealer.png",
             ),
-        ]
+        ))
         if result:
             components = [
                 ui.TextDisplay(f"### {t(f'ui.twenty_one.result_{result}_title')}"),
@@ -149,7 +121,7 @@ class TwentyOneService:
         return [ui.Container(*components, accent_colour=accent_colour)], files
 
     async def _render(self, interaction, state: TwentyOneGameState, reveal_dealer: bool = False, view=None):
-        components, files = self._build_components(state, reveal_dealer, view)
+        components, files = await self._build_components(state, reveal_dealer, view)
         await interaction.edit_original_response(components=components, files=files)
 
     async def start_game(self, interaction: ApplicationCommandInteraction, bet: int):
@@ -161,7 +133,7 @@ class TwentyOneService:
             player_cards=[deck.pop(), deck.pop()],
             dealer_cards=[deck.pop(), deck.pop()],
         )
-        components, files = self._build_components(
+        components, files = await self._build_components(
             state, view=TwentyOneView()
         )
         message = await interaction.edit_original_response(components=components, files=files)
@@ -213,9 +185,9 @@ class TwentyOneService:
         payout = int(state.bet * multiplier)
         if payout:
             await economy_management_service.update_user_balance(
-                interaction.user, payout, t(f"economy.reasons.game_{result}_twenty_one")
+                interaction.user, payout, BalanceReason[f"GAME_{result.upper()}_TWENTY_ONE"]
             )
-        components, files = self._build_components(state, reveal_dealer=True, result=result)
+        components, files = await self._build_components(state, reveal_dealer=True, result=result)
         await interaction.edit_original_response(components=components, files=files)
 
 
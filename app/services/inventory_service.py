@@ -6,9 +6,12 @@ from tortoise.exceptions import DoesNotExist
 from app.config import logger
 from app.core.enums import ItemType
 from app.core.models import Item, User as UserModel, UserItem
+from app.core.schemas import KeysetPage, PageRequest
 from app.core.variables import variables
 from app.embeds import economy_embeds
 from app.localization import t
+from app.services import achievement_handler_service
+from app.utils.pagination_utils import pagination_utils
 from app.views.pagination_view import PaginationView
 
 
@@ -27,23 +30,15 @@ class InventoryService:
         ]
 
     @staticmethod
-    async def get_user_items(user_id: int, limit: int, offset: int = 0) -> Tuple[List[Item], bool, bool]:
+    async def get_user_items(
+            user_id: int, limit: int, page_request: Optional[PageRequest] = None
+    ) -> KeysetPage:
         user, _ = await UserModel.get_or_create(user_id=user_id)
-        user_items_query = (
-            UserItem.filter(user=user)
-            .select_related("item")
-            .order_by("item__id")
-            .offset(offset)
-            .limit(limit + 1)
+        page = await pagination_utils.fetch_keyset_page(
+            UserItem.filter(user=user).select_related("item"), [("item_id", False)], limit, page_request
         )
-        user_items_raw = await user_items_query
-        items_raw = [ui_obj.item for ui_obj in user_items_raw]
-
-        has_next = len(items_raw) > limit
-        current_page_items = items_raw[:limit]
-        has_previous = offset > 0
-
-        return current_page_items, has_previous, has_next
+        page.items = [ui_obj.item for ui_obj in page.items]
+        return page
 
     @staticmethod
     async def get_total_user_items_count(user_id: int) -> int:
@@ -62,35 +57,32 @@ class InventoryService:
             try:
                 default_item = await Item.get(item_id=default_card_id)
                 await UserItem.create(user=user, item=default_item)
+                achievement_handler_service.forget_counters(user.user_id)
             except DoesNotExist:
                 logger.error(f"Error: Default item '{default_card_id}' not found in the database.")
 
     async def init_inventory_message(self, user: User | Member) -> Optional[Tuple[Embed, List[ui.View]]]:
-        items, _, has_next = await self.get_user_items(user.id, limit=variables.inventory_items_per_page)
-        embed = await economy_embeds.format_inventory_embed(user, items)
-        view = PaginationView(
-            criteria="inventory",
-            disable_first=True,
-            disable_previous=True,
-            disable_next=not has_next,
-            disable_last=not has_next
-        )
-        return embed, [view] if view.children else []
+        return await self.edit_inventory_message(user, PageRequest())
 
     async def edit_inventory_message(
-            self, user: User | Member, page: int, offset: int
+            self, user: User | Member, page_request: PageRequest, total_count: Optional[int] = None
     ) -> Optional[Tuple[Embed, List[ui.View]]]:
-        items, has_previous, has_next = await self.get_user_items(
-            user.id, limit=variables.inventory_items_per_page, offset=offset
+        if total_count is None:
+            total_count = await self.get_total_user_items_count(user.id)
+        page = await self.get_user_items(
+            user.id, limit=variables.inventory_items_per_page, page_request=page_request
         )
-        embed = await economy_embeds.format_inventory_embed(user, items, offset=offset)
+        embed = await economy_embeds.format_inventory_embed(user, page.items, offset=page_request.offset)
         view = PaginationView(
             criteria="inventory",
-            current_page=page,
-            disable_first=not has_previous,
-            disable_previous=not has_previous,
-            disable_next=not has_next,
-            disable_last=not has_next
+            current_page=page_request.page,
+            disable_first=not page.has_previous,
+            disable_previous=not page.has_previous,
+            disable_next=not page.has_next,
+            disable_last=not page.has_next,
+            previous_cursor=page.previous_cursor,
+            next_cursor=page.next_cursor,
+            total_count=total_count
         )
         return embed, [view] if view.children else []
 
@@ -0,0 +1,106 @@
+import asyncio
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from tortoise.functions import Count
+
+from app.config import logger
+from app.core.models import User as UserModel
+from app.utils.rank_index_utils import RankIndex
+
+
+class RankService:
+    def __init__(self):
+        self.indexes: Dict[str, RankIndex] = {
+            "articles": RankIndex(),
+            "balance": RankIndex(keep_zero=True),
+            "reputation": RankIndex(keep_zero=True),
+            "achievements": RankIndex(),
+        }
+        self._is_built = False
+        self._touched: Optional[Dict[str, Set[int]]] = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    async def _fetch_scores(criteria: str, user_ids: Optional[Iterable[int]] = None) -> List[Tuple[int, int]]:
+        query = UserModel.all()
+        if user_ids is not None:
+            query = query.filter(user_id__in=list(user_ids))
+
+        if criteria == "articles":
+            query = query.annotate(score=Count("viewed_objects"))
+        elif criteria == "achievements":
+            query = query.annotate(score=Count("achievements"))
+        else:
+            return await query.values_list("user_id", criteria)
+        return await query.values_list("user_id", "score")
+
+    async def build(self) -> None:
+        if self._is_built:
+            return
+
+        async with self._lock:
+            if self._is_built:
+                return
+
+            logger.info("Building leaderboard rank indexes..")
+            self._touched = {criteria: set() for criteria in self.indexes}
+            try:
+                for criteria, index in self.indexes.items():
+                    index.load(await self._fetch_scores(criteria))
+
+                for criteria, user_ids in self._touched.items():
+                    if user_ids:
+                        for user_id, score in await self._fetch_scores(criteria, user_ids):
+                            self.indexes[criteria].set(user_id, score)
+            finally:
+                self._touched = None
+
+            self._is_built = True
+            logger.info(
+                "Leaderboard rank indexes built: "
+                + ", ".join(f"{criteria}={index.count()}" for criteria, index in self.indexes.items())
+            )
+
+    async def rebuild(self) -> None:
+        self._is_built = False
+        await self.build()
+
+    def _is_ready(self, criteria: str, user_id: int) -> bool:
+        if self._touched is not None:
+            self._touched[criteria].add(user_id)
+            return False
+        return self._is_built
+
+    def set_score(self, criteria: str, user_id: int, score: int) -> None:
+        if self._is_ready(criteria, user_id):
+            self.indexes[criteria].set(user_id, score)
+
+    def increment_score(self, criteria: str, user_id: int, delta: int = 1) -> None:
+        if self._is_ready(criteria, user_id):
+            self.indexes[criteria].increment(user_id, delta)
+
+    def update_balance(self, user_id: int, balance: int, reputation: int) -> None:
+        self.set_score("balance", user_id, balance)
+        self.set_score("reputation", user_id, reputation)
+
+    def reset_scores(self, criteria: str) -> None:
+        self.indexes[criteria].reset()
+
+    async def get_page(self, criteria: str, limit: int, offset: int = 0) -> Tuple[List[Tuple[int, int]], bool, bool]:
+        await self.build()
+        index = self.indexes[criteria]
+        return index.page(offset, limit), offset > 0, offset + limit < index.count()
+
+    async def get_rank(self, criteria: str, user_id: int, score: int) -> int:
+        await self.build()
+        index = self.indexes[criteria]
+        if index.get_score(user_id) != score:
+            index.set(user_id, score)
+        return index.rank(user_id) or index.count() + 1
+
+    async def get_count(self, criteria: str) -> int:
+        await self.build()
+        return self.indexes[criteria].count()
+
+
+rank_service = RankService()
@@ -0,0 +1,102 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from app.config import logger
+from app.core.schemas import ArticleRenderJob, CardStripRenderJob, KeyCardRenderJob, RenderServiceStats
+from app.core.variables import variables
+from app.utils.render_worker_utils import render_worker_utils
+
+
+class RenderService:
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._stats = RenderServiceStats()
+
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+
+        logger.info(f"Starting render service ({variables.render_workers} worker processes)..")
+        self._executor = ProcessPoolExecutor(
+            max_workers=variables.render_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=render_worker_utils.init_worker,
+        )
+        for _ in range(variables.render_workers):
+            self._executor.submit(render_worker_utils.warm_up)
+
+    async def stop(self) -> None:
+        if self._executor is None:
+            return
+
+        logger.info(f"Stopping render service ({self._pending} jobs pending)..")
+        executor, self._executor = self._executor, None
+        await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+    def get_stats(self) -> RenderServiceStats:
+        self._stats.queue_depth = self._pending
+        return self._stats
+
+    def log_stats(self) -> None:
+        stats = self.get_stats()
+        logger.info(
+            f"Render service: {stats.completed} completed, {stats.failed} failed, {stats.timed_out} timed out, "
+            f"{stats.rejected} rejected, render time avg {stats.average_render_time * 1000:.1f}ms "
+            f"max {stats.max_render_time * 1000:.1f}ms, queue depth {stats.queue_depth} (max {stats.max_queue_depth})"
+        )
+
+    def _release_slot(self) -> None:
+        self._pending -= 1
+
+    def _on_job_done(self, loop: asyncio.AbstractEventLoop) -> None:
+        try:
+            loop.call_soon_threadsafe(self._release_slot)
+        except RuntimeError:
+            pass
+
+    async def render(self, job: KeyCardRenderJob | ArticleRenderJob | CardStripRenderJob) -> bytes:
+        if self._pending >= variables.render_workers + variables.render_queue_size:
+            self._stats.rejected += 1
+            raise asyncio.QueueFull(f"Render queue is full ({self._pending} jobs pending)")
+
+        self.start()
+        self._pending += 1
+        self._stats.max_queue_depth = max(self._stats.max_queue_depth, self._pending)
+        try:
+            future = self._executor.submit(render_worker_utils.run_job, job)
+        except Exception:
+            self._pending -= 1
+            raise
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(lambda _: self._on_job_done(loop))
+        try:
+            image_bytes, render_time = await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout=variables.render_job_timeout
+            )
+        except asyncio.TimeoutError:
+            future.cancel()
+            self._stats.timed_out += 1
+            logger.error(f"{type(job).__name__} timed out after {variables.render_job_timeout}s")
+            raise
+        except BrokenProcessPool:
+            self._stats.failed += 1
+            logger.error("Render worker process died, restarting the render pool")
+            executor, self._executor = self._executor, None
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        except Exception:
+            self._stats.failed += 1
+            raise
+
+        self._stats.completed += 1
+        self._stats.total_render_time += render_time
+        self._stats.max_render_time = max(self._stats.max_render_time, render_time)
+        return image_bytes
+
+
+render_service = RenderService()
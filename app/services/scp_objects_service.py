@@ -9,8 +9,9 @@ from disnake import User
 
 from app.config import logger
 from app.core.models import SCPObject, User as UserModel, ViewedScpObject
+from app.core.schemas import ArticleViewedEvent
 from app.core.variables import variables
-from app.services import achievement_handler_service
+from app.services import achievement_handler_service, rank_service
 
 
 class ScpObjectsService:
@@ -131,10 +132,14 @@ class ScpObjectsService:
         random_scp_object = await query.offset(random_offset).first()
 
         if random_scp_object:
-            await ViewedScpObject.get_or_create(user=db_user, scp_object=random_scp_object)
+            _, is_new_view = await ViewedScpObject.get_or_create(user=db_user, scp_object=random_scp_object)
+            if is_new_view:
+                rank_service.increment_score("articles", user.id)
 
             asyncio.create_task(
-                achievement_handler_service.handle_article_achievements(user, random_scp_object)
+                achievement_handler_service.handle_event(ArticleViewedEvent(
+                    user, object_class=random_scp_object.object_class, is_new_view=is_new_view
+                ))
             )
 
             return False, random_scp_object
@@ -7,11 +7,14 @@ from tortoise.exceptions import DoesNotExist
 from tortoise.transactions import in_transaction
 
 from app.config import logger
-from app.core.models import Item, ItemType, User as UserModel, UserItem, UserAchievement
+from app.core.enums import BalanceReason
+from app.core.models import Item, ItemType, User as UserModel, UserItem
+from app.core.schemas import ItemBoughtEvent, KeysetPage, PageRequest
 from app.core.variables import variables
 from app.embeds import economy_embeds
 from app.localization import t
-from app.services import achievement_handler_service, economy_logging_service
+from app.services import achievement_handler_service, economy_logging_service, rank_service
+from app.utils.pagination_utils import pagination_utils
 from app.views.pagination_view import PaginationView
 
 
@@ -99,42 +102,35 @@ class ShopService:
         await Item.bulk_update(all_card_items, fields=["quantity"])
 
     @staticmethod
-    async def get_shop_items(limit: int, offset: int = 0) -> Tuple[List[Item], bool, bool]:
-        items_query = Item.filter(quantity__gt=0).order_by("price", "id").offset(offset).limit(limit + 1)
-        items_raw = await items_query
-        has_next = len(items_raw) > limit
-        current_page_items = items_raw[:limit]
-        has_previous = offset > 0
-        return current_page_items, has_previous, has_next
+    async def get_shop_items(limit: int, page_request: Optional[PageRequest] = None) -> KeysetPage:
+        return await pagination_utils.fetch_keyset_page(
+            Item.filter(quantity__gt=0), [("price", False), ("id", False)], limit, page_request
+        )
 
     @staticmethod
     async def get_total_items_count() -> int:
         return await Item.filter(quantity__gt=0).count()
 
     async def init_shop_message(self) -> Optional[Tuple[Embed, List[ui.View]]]:
-        items, _, has_next = await self.get_shop_items(limit=variables.shop_items_per_page)
-        embed = await economy_embeds.format_shop_embed(items)
+        return await self.edit_shop_message(PageRequest())
+
+    async def edit_shop_message(
+            self, page_request: PageRequest, total_count: Optional[int] = None
+    ) -> Optional[Tuple[Embed, List[ui.View]]]:
+        if total_count is None:
+            total_count = await self.get_total_items_count()
+        page = await self.get_shop_items(limit=variables.shop_items_per_page, page_request=page_request)
+        embed = await economy_embeds.format_shop_embed(page.items, offset=page_request.offset)
         view = PaginationView(
             criteria="shop",
-            disable_first=True,
-            disable_previous=True,
-            disable_next=not has_next,
-            disable_last=not has_next
-        )
-        return embed, [view] if view.children else []
-
-    async def edit_shop_message(self, page: int, offset: int) -> Optional[Tuple[Embed, List[ui.View]]]:
-        items, has_previous, has_next = await self.get_shop_items(
-            limit=variables.shop_items_per_page, offset=offset
-        )
-        embed = await economy_embeds.format_shop_embed(items, offset=offset)
-        view = PaginationView(
-            criteria="shop",
-            current_page=page,
-            disable_first=not has_previous,
-            disable_previous=not has_previous,
-            disable_next=not has_next,
-            disable_last=not has_next
+            current_page=page_request.page,
+            disable_first=not page.has_previous,
+            disable_previous=not page.has_previous,
+            disable_next=not page.has_next,
+            disable_last=not page.has_next,
+            previous_cursor=page.previous_cursor,
+            next_cursor=page.next_cursor,
+            total_count=total_count
         )
         return embed, [view] if view.children else []
 
@@ -150,19 +146,12 @@ class ShopService:
 
             if item_for_update.quantity <= 0:
                 return t("responses.shop.item_out_of_stock")
-            if db_user.balance < item_for_update.price:
-                return t("errors.insufficient_funds_for_purchase", balance=db_user.balance)
             if await UserItem.filter(user=db_user, item=item_for_update).exists():
                 return t("responses.shop.item_already_owned")
 
             card_config = variables.cards.get(item_id)
             if card_config and card_config.required_achievements:
-                user_ach_ids = {
-                    ua.achievement.achievement_id
-                    for ua in await UserAchievement.filter(
-                        user=db_user
-                    ).prefetch_related("achievement")
-                }
+                user_ach_ids = await achievement_handler_service.get_user_achievements_ids(user.id)
                 missing_ids = set(card_config.required_achievements) - user_ach_ids
                 if missing_ids:
                     missing_ach_names = [
@@ -171,20 +160,29 @@ class ShopService:
                     ]
                     return t("responses.shop.missing_achievements_start") + "\n* " + "\n* ".join(missing_ach_names)
 
-            db_user.balance -= item_for_update.price
+            result = await UserModel.withdraw_balance(user.id, item_for_update.price)
+            if result is None:
+                db_user = await UserModel.get(id=db_user.id).using_db(conn)
+                return t("errors.insufficient_funds_for_purchase", balance=db_user.balance)
+
+            db_user.balance = result.balance
             item_for_update.quantity -= 1
-            await db_user.save(using_db=conn, update_fields=["balance"])
             await item_for_update.save(using_db=conn, update_fields=["quantity"])
             await UserItem.create(user=db_user, item=item_for_update, using_db=conn)
 
-        reason = t("economy.reasons.shop_item_buy", shop_item=card_config.name)
+        rank_service.update_balance(user.id, result.balance, result.reputation)
+
         asyncio.create_task(
             economy_logging_service.log_balance_change(
-                user=user, amount=-item_for_update.price, new_balance=db_user.balance, reason=reason
+                user=user,
+                amount=-item_for_update.price,
+                new_balance=result.balance,
+                reason=BalanceReason.SHOP_ITEM_BUY,
+                reason_params={"shop_item": card_config.name}
             )
         )
 
-        asyncio.create_task(achievement_handler_service.handle_shop_achievements(user, item_id))
+        asyncio.create_task(achievement_handler_service.handle_event(ItemBoughtEvent(user, item_id=item_id)))
         return t("responses.shop.buy_success", item_name=item.name)
 
 
@@ -3,10 +3,11 @@ import random
 
 from disnake import User, Embed
 
+from app.core.enums import BalanceReason
 from app.core.models import User as UserModel, UserItem
+from app.core.schemas import WorkFinishedEvent
 from app.core.variables import variables
 from app.embeds import economy_embeds
-from app.localization import t
 from app.services import achievement_handler_service, economy_management_service
 
 
@@ -38,9 +39,9 @@ class WorkService:
         multiplier = work_card.work_reward_multiplier if work_card and work_card.work_reward_multiplier else 1.0
         reward = round(random.randint(*variables.legal_work_reward_range) * multiplier)
 
-        await economy_management_service.update_user_balance(user, reward, t("economy.reasons.legal_work"))
+        await economy_management_service.update_user_balance(user, reward, BalanceReason.LEGAL_WORK)
         asyncio.create_task(
-            achievement_handler_service.handle_work_achievements(user, is_risky=False, is_success=True)
+            achievement_handler_service.handle_event(WorkFinishedEvent(user))
         )
         return await economy_embeds.format_legal_work_embed(prompt, reward)
 
@@ -56,20 +57,22 @@ class WorkService:
             multiplier = work_card.work_reward_multiplier if work_card and work_card.work_reward_multiplier else 1.0
             amount = round(random.randint(*variables.non_legal_work_reward_range) * multiplier)
             await economy_management_service.update_user_balance(
-                user, amount, t("economy.reasons.risky_work_success")
+                user, amount, BalanceReason.RISKY_WORK_SUCCESS
             )
             asyncio.create_task(
-                achievement_handler_service.handle_work_achievements(user, is_risky=True, is_success=True)
+                achievement_handler_service.handle_event(WorkFinishedEvent(user, is_risky=True))
             )
         else:
             prompt = random.choice(non_legal_prompts.failure)
             multiplier = work_card.risky_work_penalty_multiplier if work_card else 1.0
             amount = round(random.randint(*variables.non_legal_work_penalty_range) * multiplier)
             await economy_management_service.update_user_balance(
-                user, -amount, t("economy.reasons.risky_work_failure")
+                user, -amount, BalanceReason.RISKY_WORK_FAILURE
             )
             asyncio.create_task(
-                achievement_handler_service.handle_work_achievements(user, is_risky=True, is_success=False)
+                achievement_handler_service.handle_event(
+                    WorkFinishedEvent(user, is_risky=True, is_success=False)
+                )
             )
 
         return await economy_embeds.format_non_legal_work_embed(prompt, amount, is_success)
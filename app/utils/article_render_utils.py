@@ -0,0 +1,82 @@
+import textwrap
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+from app.core.variables import variables
+
+
+class ArticleRenderUtils:
+    def __init__(self):
+        self._template: Optional[Image.Image] = None
+        self._fonts: Dict[Tuple[str, int], ImageFont.FreeTypeFont] = {}
+
+    def _get_template(self) -> Image.Image:
+        if self._template is None:
+            with Image.open(variables.article_template_path) as template:
+                self._template = template.convert("RGBA")
+        return self._template
+
+    def _get_font(self, font_path: str, size: int) -> ImageFont.FreeTypeFont:
+        if (font_path, size) not in self._fonts:
+            self._fonts[(font_path, size)] = ImageFont.truetype(font_path, size)
+        return self._fonts[(font_path, size)]
+
+    def preload(self) -> None:
+        img_height = self._get_template().height
+        self._get_font(variables.primary_font_path, int(img_height / 8))
+        self._get_font(variables.secondary_font_path, int(img_height / 10))
+
+    @staticmethod
+    def _draw_text_with_shadow(draw, pos, text, font, main_color):
+        x, y = pos
+        shadow_pos = (x + (2, 2)[0], y + (2, 2)[1])
+        draw.text(shadow_pos, text, font=font, fill=(0, 0, 0, 150))
+        draw.text(pos, text, font=font, fill=main_color)
+
+    def render(self, number: str, title: str) -> bytes:
+        base_image = self._get_template()
+        img_width, img_height = base_image.size
+
+        text_layer = Image.new("RGBA", base_image.size, (0, 0, 0, 0))
+        draw = ImageDraw.Draw(text_layer)
+
+        number_font_size = int(img_height / 8)
+        title_font_size = int(img_height / 10)
+        number_font = self._get_font(variables.primary_font_path, number_font_size)
+        title_font = self._get_font(variables.secondary_font_path, title_font_size)
+
+        avg_char_width = title_font_size * 0.6
+        max_chars_per_line = int((img_width * 0.95) / avg_char_width)
+        wrapped_title_lines = textwrap.wrap(title, width=max_chars_per_line, break_long_words=True)
+
+        spacing_after_number = int(img_height / 20)
+        title_line_bbox = draw.textbbox((0, 0), "A", font=title_font)
+        title_line_height = title_line_bbox[3] - title_line_bbox[1]
+        spacing_between_lines = int(title_line_height * 0.3)
+
+        current_y = img_height / 2
+
+        number_bbox = draw.textbbox((0, 0), number, font=number_font)
+        number_width = number_bbox[2] - number_bbox[0]
+        number_height = number_bbox[3] - number_bbox[1]
+        number_x = (img_width - number_width) / 2
+        self._draw_text_with_shadow(draw, (number_x, current_y), number, number_font, (50, 50, 50))
+        current_y += number_height + spacing_after_number
+
+        for line in wrapped_title_lines:
+            line_bbox = draw.textbbox((0, 0), line, font=title_font)
+            line_width = line_bbox[2] - line_bbox[0]
+            line_x = (img_width - line_width) / 2
+            self._draw_text_with_shadow(draw, (line_x, current_y), line, title_font, (50, 50, 50))
+            current_y += title_line_height + spacing_between_lines
+
+        out_image = Image.alpha_composite(base_image, text_layer)
+
+        buffer = BytesIO()
+        out_image.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+
+article_render_utils = ArticleRenderUtils()
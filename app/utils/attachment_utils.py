@@ -0,0 +1,72 @@
+import hashlib
+import time
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from cachetools import LRUCache
+from disnake import Embed, Message
+
+from app.config import logger
+from app.core.schemas import AttachmentImage
+from app.core.variables import variables
+
+
+class AttachmentRegistry:
+    key_length = 16
+
+    def __init__(self):
+        self._urls: LRUCache[str, Tuple[str, float]] = LRUCache(maxsize=variables.attachment_registry_size)
+
+    def get_image(self, data: bytes, filename: str) -> AttachmentImage:
+        key = hashlib.sha256(data).hexdigest()[:self.key_length]
+        image = AttachmentImage(key=key, filename=f"{key}_{filename}", data=data)
+
+        entry = self._urls.get(key)
+        if entry is not None:
+            url, expires_at = entry
+            if expires_at - variables.attachment_url_expiry_margin > time.time():
+                image.url = url
+            else:
+                del self._urls[key]
+        return image
+
+    @staticmethod
+    def set_embed_image(embed: Embed, image: AttachmentImage) -> None:
+        if image.url:
+            embed.set_image(url=image.url)
+        else:
+            embed.set_image(file=image.to_file())
+
+    @staticmethod
+    def _get_expiry(url: str) -> float:
+        expires_at = parse_qs(urlparse(url).query).get("ex")
+        if expires_at:
+            try:
+                return float(int(expires_at[0], 16))
+            except ValueError:
+                pass
+        return time.time() + variables.attachment_url_default_ttl
+
+    @staticmethod
+    def _find_embed_url(message: Message, image: AttachmentImage) -> Optional[str]:
+        for embed in message.embeds:
+            url = embed.image.url
+            if url and urlparse(url).path.endswith(f"/{image.filename}"):
+                return url
+        return None
+
+    def remember(self, image: AttachmentImage, message: Message) -> None:
+        if image.url:
+            return
+
+        url = self._find_embed_url(message, image)
+        if url:
+            self._urls[image.key] = (url, self._get_expiry(url))
+
+    def forget(self, image: AttachmentImage) -> None:
+        logger.warning(f"Attachment URL of '{image.filename}' was rejected, re-uploading")
+        self._urls.pop(image.key, None)
+        image.url = None
+
+
+attachment_registry = AttachmentRegistry()
@@ -0,0 +1,72 @@
+import os
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from app.core.variables import variables
+
+
+class CardStripRenderUtils:
+    card_image_width = 96
+    card_gap = 8
+
+    def __init__(self):
+        self._atlas: Optional[Image.Image] = None
+        self._sprite_boxes: Dict[str, Tuple[int, int, int, int]] = {}
+
+    @staticmethod
+    def _get_filenames() -> List[str]:
+        filenames = [
+            variables.twenty_one["card_filename"].format(rank=rank["id"], suit=suit)
+            for rank in variables.twenty_one["ranks"]
+            for suit in variables.twenty_one["suits"]
+        ]
+        filenames.append(variables.twenty_one["backside_filename"])
+        return filenames
+
+    def _load_sprite(self, filename: str) -> Image.Image:
+        width = self.card_image_width
+        with Image.open(os.path.join(variables.playing_cards_dir_path, filename)) as source:
+            image = source.convert("RGBA")
+        height = round(image.height * width / image.width)
+        return image.resize((width, height), Image.Resampling.LANCZOS)
+
+    def preload(self) -> None:
+        sprites = [(filename, self._load_sprite(filename)) for filename in self._get_filenames()]
+        width = self.card_image_width
+        atlas = Image.new("RGBA", (width * len(sprites), max(sprite.height for _, sprite in sprites)), (0, 0, 0, 0))
+        sprite_boxes = {}
+        for index, (filename, sprite) in enumerate(sprites):
+            atlas.paste(sprite, (index * width, 0))
+            sprite_boxes[filename] = (index * width, 0, (index + 1) * width, sprite.height)
+        self._atlas = atlas
+        self._sprite_boxes = sprite_boxes
+
+    def _get_sprite(self, filename: str) -> Image.Image:
+        if self._atlas is None:
+            self.preload()
+        box = self._sprite_boxes.get(filename)
+        if box is None:
+            return self._load_sprite(filename)
+        return self._atlas.crop(box)
+
+    def render(self, filenames: List[str]) -> bytes:
+        width = self.card_image_width
+        gap = self.card_gap
+        sprites = [self._get_sprite(filename) for filename in filenames]
+
+        strip = Image.new(
+            "RGBA",
+            (width * len(sprites) + gap * (len(sprites) - 1), max(sprite.height for sprite in sprites)),
+            (0, 0, 0, 0),
+        )
+        for index, sprite in enumerate(sprites):
+            strip.paste(sprite, (index * (width + gap), 0))
+
+        stream = BytesIO()
+        strip.save(stream, format="PNG")
+        return stream.getvalue()
+
+
+card_strip_render_utils = CardStripRenderUtils()
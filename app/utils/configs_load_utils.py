@@ -9,7 +9,9 @@ from app.core.schemas import (
     CardConfig,
     WorkPrompts,
     NonLegalPrompts,
-    AchievementConfig
+    AchievementConfig,
+    AchievementCondition,
+    AchievementRule
 )
 
 
@@ -90,7 +92,17 @@ class ConfigsLoadUtils:
                 loaded_achievements[key] = AchievementConfig(
                     name=data["name"],
                     description=data["description"],
-                    icon=data["icon"]
+                    icon=data["icon"],
+                    rules=[
+                        AchievementRule(
+                            event=rule["event"],
+                            conditions=[
+                                AchievementCondition(field=field, operator=operator, value=value)
+                                for field, operator, value in rule.get("conditions", [])
+                            ]
+                        )
+                        for rule in data.get("rules", [])
+                    ]
                 )
             return loaded_achievements
 
@@ -103,6 +115,9 @@ class ConfigsLoadUtils:
         except KeyError as e:
             logging.error(f"Missing key in achievement data from {achievements_config_path}: {e}")
             exit(1)
+        except ValueError as e:
+            logging.error(f"Malformed achievement rule condition in {achievements_config_path}: {e}")
+            exit(1)
 
 
 configs_load_utils = ConfigsLoadUtils()
@@ -0,0 +1,162 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.config import logger
+from app.core.schemas import ImageCacheStats
+
+
+class ImageCache:
+    def __init__(self, name: str, memory_budget: int, disk_dir: str, disk_budget: int):
+        self.name = name
+        self.memory_budget = memory_budget
+        self.disk_dir = disk_dir
+        self.disk_budget = disk_budget
+
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: Optional[Dict[str, Tuple[int, float]]] = None
+        self._disk_bytes = 0
+        self._disk_lock = asyncio.Lock()
+        self._stats = ImageCacheStats()
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.png")
+
+    def _put_memory(self, key: str, data: bytes) -> None:
+        if len(data) > self.memory_budget:
+            return
+
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+
+        while self._memory_bytes > self.memory_budget:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _scan_disk(self) -> Dict[str, Tuple[int, float]]:
+        os.makedirs(self.disk_dir, exist_ok=True)
+        entries = {}
+        with os.scandir(self.disk_dir) as directory:
+            for entry in directory:
+                if entry.is_file() and entry.name.endswith(".png"):
+                    stat = entry.stat()
+                    entries[entry.name[:-4]] = (stat.st_size, stat.st_mtime)
+        return entries
+
+    async def _ensure_disk_index(self) -> Dict[str, Tuple[int, float]]:
+        if self._disk is None:
+            self._disk = await asyncio.to_thread(self._scan_disk)
+            self._disk_bytes = sum(size for size, _ in self._disk.values())
+            logger.info(
+                f"Loaded {self.name} image cache: {len(self._disk)} entries, {self._disk_bytes} bytes on disk"
+            )
+        return self._disk
+
+    def _read_file(self, key: str) -> bytes:
+        path = self._get_path(key)
+        with open(path, "rb") as file:
+            data = file.read()
+        os.utime(path)
+        return data
+
+    def _write_file(self, key: str, data: bytes) -> None:
+        path = self._get_path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, path)
+
+    def _remove_files(self, keys) -> None:
+        for key in keys:
+            try:
+                os.remove(self._get_path(key))
+            except FileNotFoundError:
+                pass
+
+    async def contains(self, key: str) -> bool:
+        if key in self._memory:
+            return True
+        try:
+            return key in await self._ensure_disk_index()
+        except OSError:
+            return False
+
+    async def get(self, key: str) -> Optional[bytes]:
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            self._stats.memory_hits += 1
+            return data
+
+        try:
+            disk = await self._ensure_disk_index()
+            if key in disk:
+                data = await asyncio.to_thread(self._read_file, key)
+                disk[key] = (len(data), time.time())
+                self._put_memory(key, data)
+                self._stats.disk_hits += 1
+                return data
+        except OSError as e:
+            self._stats.disk_errors += 1
+            logger.error(f"Failed to read '{key}' from the {self.name} image cache: {e}")
+
+        self._stats.misses += 1
+        return None
+
+    async def put(self, key: str, data: bytes, keep_in_memory: bool = True) -> None:
+        if keep_in_memory:
+            self._put_memory(key, data)
+
+        try:
+            async with self._disk_lock:
+                disk = await self._ensure_disk_index()
+                await asyncio.to_thread(self._write_file, key, data)
+                previous = disk.pop(key, None)
+                if previous is not None:
+                    self._disk_bytes -= previous[0]
+                disk[key] = (len(data), time.time())
+                self._disk_bytes += len(data)
+
+                if self._disk_bytes <= self.disk_budget:
+                    return
+
+                evicted = []
+                for evicted_key, (size, _) in sorted(disk.items(), key=lambda item: item[1][1]):
+                    if self._disk_bytes <= self.disk_budget:
+                        break
+                    evicted.append(evicted_key)
+                    self._disk_bytes -= size
+                for evicted_key in evicted:
+                    del disk[evicted_key]
+                if evicted:
+                    await asyncio.to_thread(self._remove_files, evicted)
+        except OSError as e:
+            self._stats.disk_errors += 1
+            logger.error(f"Failed to write '{key}' to the {self.name} image cache: {e}")
+
+    def get_stats(self) -> ImageCacheStats:
+        self._stats.memory_entries = len(self._memory)
+        self._stats.memory_bytes = self._memory_bytes
+        self._stats.disk_entries = len(self._disk) if self._disk is not None else 0
+        self._stats.disk_bytes = self._disk_bytes
+        return self._stats
+
+    def log_stats(self) -> None:
+        stats = self.get_stats()
+        logger.info(
+            f"{self.name.capitalize()} image cache: hit ratio {stats.hit_ratio:.1%} "
+            f"({stats.memory_hits} memory, {stats.disk_hits} disk, {stats.misses} misses), "
+            f"memory {stats.memory_bytes} bytes in {stats.memory_entries} entries, "
+            f"disk {stats.disk_bytes} bytes in {stats.disk_entries} entries"
+        )
@@ -0,0 +1,67 @@
+import threading
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageDraw
+from cachetools import LRUCache
+
+from app.core.variables import variables
+
+
+class KeyCardAssetStore:
+    mask_supersample_multiplier = 4
+
+    def __init__(self):
+        self._templates: Dict[str, Image.Image] = {}
+        self._masks: Dict[Tuple[int, int], Image.Image] = {}
+        self._avatars: LRUCache[Tuple[str, Tuple[int, int]], Image.Image] = LRUCache(
+            maxsize=variables.decoded_avatar_cache_size
+        )
+        self._lock = threading.Lock()
+
+    def get_template(self, template_id: str) -> Image.Image:
+        template = self._templates.get(template_id)
+        if template is None:
+            with self._lock:
+                template = self._templates.get(template_id)
+                if template is None:
+                    template = variables.cards[template_id].image.convert("RGBA")
+                    self._templates[template_id] = template
+        return template
+
+    def get_circle_mask(self, size: Tuple[int, int]) -> Image.Image:
+        mask = self._masks.get(size)
+        if mask is None:
+            large_size = (size[0] * self.mask_supersample_multiplier, size[1] * self.mask_supersample_multiplier)
+            mask_large = Image.new("L", large_size, 0)
+            ImageDraw.Draw(mask_large).ellipse((0, 0) + large_size, fill=255)
+            mask = mask_large.resize(size, Image.Resampling.LANCZOS)
+            with self._lock:
+                mask = self._masks.setdefault(size, mask)
+        return mask
+
+    def get_avatar(self, avatar: bytes, size: Tuple[int, int], avatar_key: Optional[str] = None) -> Image.Image:
+        if avatar_key is not None:
+            with self._lock:
+                image = self._avatars.get((avatar_key, size))
+            if image is not None:
+                return image
+
+        with Image.open(BytesIO(avatar)) as source:
+            image = source.convert("RGBA")
+        if image.size != size:
+            image = image.resize(size, Image.Resampling.LANCZOS)
+
+        if avatar_key is not None:
+            with self._lock:
+                self._avatars[(avatar_key, size)] = image
+        return image
+
+    def preload(self, mask_sizes: Tuple[Tuple[int, int], ...] = ()) -> None:
+        for template_id in variables.cards:
+            self.get_template(template_id)
+        for size in mask_sizes:
+            self.get_circle_mask(size)
+
+
+keycard_asset_store = KeyCardAssetStore()
@@ -0,0 +1,154 @@
+import threading
+import unicodedata
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+from app.core.variables import variables
+from app.utils.keycard_asset_utils import keycard_asset_store
+
+
+class KeyCardRenderUtils:
+    avatar_position = (1180, 510)
+    avatar_size = (390, 390)
+    decoration_position = (1160, 492)
+    decoration_size = (430, 430)
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _get_font(self, font_path: str, size: int) -> ImageFont.FreeTypeFont:
+        fonts: Optional[Dict[Tuple[str, int], ImageFont.FreeTypeFont]] = getattr(self._local, "fonts", None)
+        if fonts is None:
+            fonts = self._local.fonts = {}
+        if (font_path, size) not in fonts:
+            fonts[(font_path, size)] = ImageFont.truetype(font_path, size=size)
+        return fonts[(font_path, size)]
+
+    def preload(self) -> None:
+        self._get_font(variables.primary_font_path, 45)
+        self._get_font(variables.secondary_font_path, 130)
+        keycard_asset_store.preload(mask_sizes=(self.avatar_size,))
+
+    @staticmethod
+    def _int_to_rgb(color_int: int) -> Tuple[int, int, int]:
+        r = (color_int >> 16) & 0xFF
+        g = (color_int >> 8) & 0xFF
+        b = color_int & 0xFF
+        return r, g, b
+
+    def _add_text(
+            self,
+            draw: ImageDraw.ImageDraw,
+            text: str,
+            position: Tuple[int, int],
+            font_path: str,
+            font_size: int,
+            color: int
+    ) -> None:
+        font = self._get_font(font_path, font_size)
+        fill_color = self._int_to_rgb(color)
+        normalized_text = unicodedata.normalize("NFKC", text)
+        draw.text(position, normalized_text, font=font, fill=fill_color)
+
+    def _add_spaced_text(
+            self,
+            draw: ImageDraw.ImageDraw,
+            text: str,
+            position: Tuple[int, int],
+            font_path: str,
+            font_size: int,
+            color: int,
+            spacing: int
+    ) -> None:
+        font = self._get_font(font_path, font_size)
+        fill_color = self._int_to_rgb(color)
+        x, y = position
+        for char in text:
+            draw.text((x, y), char, font=font, fill=fill_color)
+            char_width = draw.textlength(char, font=font)
+            x += char_width + spacing
+
+    @staticmethod
+    def _add_circular_avatar(
+            image: Image.Image,
+            image_bytes: bytes,
+            avatar_key: Optional[str],
+            position: Tuple[int, int],
+            size: Tuple[int, int]
+    ) -> None:
+        try:
+            avatar = keycard_asset_store.get_avatar(image_bytes, size, avatar_key)
+        except (FileNotFoundError, IOError):
+            return
+
+        image.paste(avatar, position, keycard_asset_store.get_circle_mask(size))
+
+    @staticmethod
+    def _add_overlay(
+            image: Image.Image,
+            image_bytes: BytesIO,
+            position: Tuple[int, int],
+            size: Tuple[int, int]
+    ) -> None:
+        try:
+            decoration = Image.open(image_bytes).convert("RGBA")
+        except (FileNotFoundError, IOError):
+            return
+
+        decoration = decoration.resize(size, Image.Resampling.LANCZOS)
+
+        image.paste(decoration, position, decoration)
+
+    def render(
+            self,
+            template_id: str,
+            user_name: str,
+            user_code: str,
+            avatar: bytes,
+            avatar_key: Optional[str] = None,
+            avatar_decoration: Optional[bytes] = None,
+    ) -> bytes:
+        template = variables.cards[template_id]
+        image = keycard_asset_store.get_template(template_id).copy()
+        draw = ImageDraw.Draw(image)
+
+        self._add_spaced_text(
+            draw,
+            text=user_code,
+            position=(630, 240),
+            font_path=variables.primary_font_path,
+            font_size=45,
+            color=template.secondary_color,
+            spacing=30
+        )
+        self._add_circular_avatar(
+            image,
+            image_bytes=avatar,
+            avatar_key=avatar_key,
+            position=self.avatar_position,
+            size=self.avatar_size
+        )
+        if avatar_decoration is not None:
+            self._add_overlay(
+                image,
+                image_bytes=BytesIO(avatar_decoration),
+                position=self.decoration_position,
+                size=self.decoration_size
+            )
+        self._add_text(
+            draw,
+            text=user_name,
+            position=(53, 303),
+            font_path=variables.secondary_font_path,
+            font_size=130,
+            color=template.primary_color
+        )
+
+        image_buffer = BytesIO()
+        image.save(image_buffer, format="PNG")
+        return image_buffer.getvalue()
+
+
+keycard_render_utils = KeyCardRenderUtils()
@@ -1,11 +1,22 @@
 import re
-from io import BytesIO
-from typing import Tuple, Optional
+from typing import Optional, Tuple
 
-from disnake import User, Member
+from cachetools import LRUCache
+from disnake import Asset, User, Member
+
+from app.core.schemas import KeyCardMetadata
+from app.core.variables import variables
 
 
 class KeyCardUtils:
+    min_asset_size = 16
+    max_asset_size = 4096
+
+    def __init__(self):
+        self._avatars: LRUCache[Tuple[str, int], bytes] = LRUCache(
+            maxsize=variables.avatar_cache_memory_budget, getsizeof=len
+        )
+
     @staticmethod
     async def process_username(user_name: str) -> str:
         processed_name = re.sub(r'\[.*?\]|\(.*?\)|\{.*?\}', '', user_name).strip()
@@ -24,9 +35,7 @@ class KeyCardUtils:
     async def get_user_code(timestamp: float) -> str:
         return "-".join(str(round(timestamp, 1)).split("."))
 
-    async def collect_user_data(
-            self, user: User | Member
-    ) -> Tuple[int, str, str, BytesIO, str, Optional[BytesIO], Optional[str]]:
+    async def collect_user_metadata(self, user: User | Member) -> KeyCardMetadata:
         try:
             user_code = await self.get_user_code(user.joined_at.timestamp())
         except AttributeError:
@@ -41,17 +50,31 @@ class KeyCardUtils:
         else:
             avatar = user.default_avatar
 
-        avatar_bytes = BytesIO(await avatar.read())
-        avatar_key = avatar.key
+        return KeyCardMetadata(
+            user_id=user.id,
+            user_name=user_name,
+            user_code=user_code,
+            avatar=avatar,
+            avatar_decoration=user.avatar_decoration
+        )
 
-        avatar_decoration = user.avatar_decoration
-        avatar_decoration_bytes = None
-        avatar_decoration_key = None
-        if avatar_decoration:
-            avatar_decoration_bytes = BytesIO(await avatar_decoration.read())
-            avatar_decoration_key = avatar_decoration.key
+    @staticmethod
+    async def read_asset(asset: Optional[Asset]) -> Optional[bytes]:
+        if asset is None:
+            return None
+        return await asset.read()
 
-        return user.id, user_name, user_code, avatar_bytes, avatar_key, avatar_decoration_bytes, avatar_decoration_key
+    def get_asset_size(self, target_size: int) -> int:
+        size = 1 << (target_size - 1).bit_length()
+        return min(max(size, self.min_asset_size), self.max_asset_size)
 
+    async def read_avatar(self, avatar: Asset, target_size: int) -> bytes:
+        size = self.get_asset_size(target_size)
+        cache_key = (avatar.key, size)
+        avatar_bytes = self._avatars.get(cache_key)
+        if avatar_bytes is None:
+            avatar_bytes = await avatar.with_size(size).with_format("png").read()
+            self._avatars[cache_key] = avatar_bytes
+        return avatar_bytes
 
 keycard_utils = KeyCardUtils()
@@ -1,8 +1,22 @@
 import math
-from typing import Tuple
+import re
+import string
+from typing import List, Optional, Sequence, Tuple
+
+from tortoise.expressions import Q
+from tortoise.queryset import QuerySet
+
+from app.core.schemas import KeysetPage, PageRequest, PaginationState
 
 
 class PaginationUtils:
+    cursor_alphabet = string.digits + string.ascii_lowercase
+    cursor_separator = "."
+    state_prefix = "pg1"
+    state_separator = ":"
+    state_actions = ("first", "previous", "current", "next", "last")
+    legacy_state_pattern = re.compile(r"^(first|previous|current|next|last)_page_(.+)_button(?::.*)?$")
+
     @staticmethod
     async def get_last_page_offset(total_count: int, limit: int) -> Tuple[int, int]:
         if total_count == 0:
@@ -11,5 +25,132 @@ class PaginationUtils:
         offset = max(0, (total_pages - 1) * limit)
         return offset, total_pages
 
+    def _encode_int(self, value: int) -> str:
+        if value < 0:
+            return "-" + self._encode_int(-value)
+        digits = []
+        while True:
+            value, remainder = divmod(value, len(self.cursor_alphabet))
+            digits.append(self.cursor_alphabet[remainder])
+            if value == 0:
+                return "".join(reversed(digits))
+
+    def encode_cursor(self, values: Sequence[int]) -> str:
+        return self.cursor_separator.join(self._encode_int(value) for value in values)
+
+    def decode_cursor(self, cursor: str) -> Tuple[int, ...]:
+        return tuple(int(part, len(self.cursor_alphabet)) for part in cursor.split(self.cursor_separator))
+
+    def _decode_int(self, value: str) -> Optional[int]:
+        return int(value, len(self.cursor_alphabet)) if value else None
+
+    def encode_state(self, state: PaginationState) -> str:
+        return self.state_separator.join((
+            self.state_prefix,
+            state.action,
+            state.criteria,
+            self._encode_int(state.page),
+            self._encode_int(state.total_count) if state.total_count is not None else "",
+            state.cursor or "",
+            self._encode_int(state.target_user_id) if state.target_user_id is not None else "",
+        ))
+
+    def decode_state(self, custom_id: str) -> Optional[PaginationState]:
+        parts = custom_id.split(self.state_separator)
+        if parts[0] != self.state_prefix:
+            legacy_match = self.legacy_state_pattern.match(custom_id)
+            return PaginationState(criteria=legacy_match.group(2)) if legacy_match else None
+
+        try:
+            _, action, criteria, page, total_count, cursor, target_user_id = parts
+            if action not in self.state_actions:
+                return None
+            return PaginationState(
+                criteria=criteria,
+                action=action,
+                page=self._decode_int(page) or 1,
+                total_count=self._decode_int(total_count),
+                cursor=cursor or None,
+                target_user_id=self._decode_int(target_user_id),
+            )
+        except ValueError:
+            return None
+
+    async def get_page_request(self, state: PaginationState, items_per_page: int) -> PageRequest:
+        if state.action == "previous":
+            page = max(1, state.page - 1)
+            return PageRequest(
+                page=page, offset=(page - 1) * items_per_page, action="previous", cursor=state.cursor
+            )
+        if state.action == "next":
+            return PageRequest(
+                page=state.page + 1, offset=state.page * items_per_page, action="next", cursor=state.cursor
+            )
+        if state.action == "last" and state.total_count is not None:
+            offset, page = await self.get_last_page_offset(total_count=state.total_count, limit=items_per_page)
+            return PageRequest(page=page, offset=offset, action="last", last_page_size=state.total_count - offset)
+        return PageRequest()
+
+    @staticmethod
+    def _build_ordering(keys: Sequence[Tuple[str, bool]], forward: bool) -> List[str]:
+        return [f"-{field}" if descending == forward else field for field, descending in keys]
+
+    @staticmethod
+    def _build_seek_filter(keys: Sequence[Tuple[str, bool]], values: Tuple[int, ...], forward: bool) -> Q:
+        conditions = []
+        for index, (field, descending) in enumerate(keys):
+            operator = "gt" if forward != descending else "lt"
+            equal_prefix = {prefix_field: values[i] for i, (prefix_field, _) in enumerate(keys[:index])}
+            conditions.append(Q(**equal_prefix, **{f"{field}__{operator}": values[index]}))
+        return Q(*conditions, join_type="OR")
+
+    def _get_cursor(self, row, keys: Sequence[Tuple[str, bool]]) -> str:
+        return self.encode_cursor([getattr(row, field) for field, _ in keys])
+
+    async def fetch_keyset_page(
+            self,
+            query: QuerySet,
+            keys: Sequence[Tuple[str, bool]],
+            limit: int,
+            page_request: Optional[PageRequest] = None
+    ) -> KeysetPage:
+        page_request = page_request or PageRequest()
+        action = page_request.action
+        cursor: Optional[Tuple[int, ...]] = None
+        if page_request.cursor:
+            try:
+                cursor = self.decode_cursor(page_request.cursor)
+            except ValueError:
+                cursor = None
+
+        forward = action != "last" and not (action == "previous" and cursor)
+        if action == "last" and page_request.last_page_size is not None:
+            limit = page_request.last_page_size
+
+        if cursor and action in ("previous", "next"):
+            query = query.filter(self._build_seek_filter(keys, cursor, forward))
+        elif action in ("previous", "next"):
+            query = query.offset(page_request.offset)
+
+        rows = await query.order_by(*self._build_ordering(keys, forward)).limit(limit + 1)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        if forward:
+            has_previous = action != "first" and (cursor is not None or page_request.offset > 0)
+            has_next = has_more
+        else:
+            rows.reverse()
+            has_previous = has_more
+            has_next = action != "last"
+
+        return KeysetPage(
+            items=rows,
+            has_previous=has_previous,
+            has_next=has_next,
+            previous_cursor=self._get_cursor(rows[0], keys) if rows else None,
+            next_cursor=self._get_cursor(rows[-1], keys) if rows else None,
+        )
+
 
 pagination_utils = PaginationUtils()
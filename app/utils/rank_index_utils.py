@@ -0,0 +1,54 @@
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class RankIndex:
+    def __init__(self, keep_zero: bool = False):
+        self._keep_zero = keep_zero
+        self._keys: List[Tuple[int, int]] = []
+        self._scores: Dict[int, int] = {}
+
+    def load(self, scores: Iterable[Tuple[int, int]]) -> None:
+        self._scores = {
+            user_id: score for user_id, score in scores
+            if self._keep_zero or score > 0
+        }
+        self._keys = sorted((-score, user_id) for user_id, score in self._scores.items())
+
+    def reset(self) -> None:
+        if self._keep_zero:
+            self.load((user_id, 0) for user_id in self._scores)
+        else:
+            self.load(())
+
+    def get_score(self, user_id: int) -> Optional[int]:
+        return self._scores.get(user_id)
+
+    def set(self, user_id: int, score: int) -> None:
+        old_score = self._scores.get(user_id)
+        if old_score == score:
+            return
+
+        if old_score is not None:
+            del self._keys[bisect_left(self._keys, (-old_score, user_id))]
+            del self._scores[user_id]
+
+        if self._keep_zero or score > 0:
+            insort(self._keys, (-score, user_id))
+            self._scores[user_id] = score
+
+    def increment(self, user_id: int, delta: int) -> None:
+        self.set(user_id, (self._scores.get(user_id) or 0) + delta)
+
+    def count(self) -> int:
+        return bisect_left(self._keys, (0,))
+
+    def page(self, offset: int, limit: int) -> List[Tuple[int, int]]:
+        end = min(offset + limit, self.count())
+        return [(user_id, -negative_score) for negative_score, user_id in self._keys[offset:end]]
+
+    def rank(self, user_id: int) -> Optional[int]:
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return bisect_left(self._keys, (-score, user_id)) + 1
@@ -0,0 +1,42 @@
+import time
+from typing import Tuple
+
+from app.core.schemas import ArticleRenderJob, CardStripRenderJob, KeyCardRenderJob
+from app.utils.article_render_utils import article_render_utils
+from app.utils.card_strip_render_utils import card_strip_render_utils
+from app.utils.keycard_render_utils import keycard_render_utils
+
+
+class RenderWorkerUtils:
+    @staticmethod
+    def init_worker() -> None:
+        keycard_render_utils.preload()
+        article_render_utils.preload()
+        card_strip_render_utils.preload()
+
+    @staticmethod
+    def warm_up() -> bool:
+        return True
+
+    @staticmethod
+    def run_job(job: KeyCardRenderJob | ArticleRenderJob | CardStripRenderJob) -> Tuple[bytes, float]:
+        started_at = time.perf_counter()
+        if isinstance(job, KeyCardRenderJob):
+            image_bytes = keycard_render_utils.render(
+                job.template_id,
+                job.user_name,
+                job.user_code,
+                job.avatar,
+                job.avatar_key,
+                job.avatar_decoration,
+            )
+        elif isinstance(job, ArticleRenderJob):
+            image_bytes = article_render_utils.render(job.number, job.title)
+        elif isinstance(job, CardStripRenderJob):
+            image_bytes = card_strip_render_utils.render(job.filenames)
+        else:
+            raise TypeError(f"Unsupported render job: {type(job).__name__}")
+        return image_bytes, time.perf_counter() - started_at
+
+
+render_worker_utils = RenderWorkerUtils()
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 from disnake import (
     MessageFlags,
@@ -7,13 +7,16 @@ from disnake import (
     Message,
     User,
     Forbidden,
+    HTTPException,
     ui,
     File
 )
 
 from app.config import logger
 from app.core.models import Achievement
+from app.core.schemas import AttachmentImage
 from app.localization import t
+from app.utils.attachment_utils import attachment_registry
 
 
 class ResponseUtils:
@@ -37,6 +40,24 @@ class ResponseUtils:
             content=message, embed=embed, view=view, delete_after=delete_after
         )
 
+    @staticmethod
+    async def send_image_response(
+            interaction,
+            embed: Embed,
+            image: AttachmentImage,
+            view: Optional[ui.View] = None
+    ) -> None:
+        attachment_registry.set_embed_image(embed, image)
+        try:
+            message = await interaction.edit_original_response(content=None, embed=embed, view=view)
+        except HTTPException:
+            if not image.url:
+                raise
+            attachment_registry.forget(image)
+            attachment_registry.set_embed_image(embed, image)
+            message = await interaction.edit_original_response(content=None, embed=embed, view=view)
+        attachment_registry.remember(image, message)
+
     @staticmethod
     async def edit_response(
             interaction,
@@ -87,13 +108,21 @@ class ResponseUtils:
     async def send_new_message(
             channel: TextChannel,
             message: Optional[str] = None,
-            embed: Optional[Embed] = None
+            embed: Optional[Embed] = None,
+            embeds: Optional[List[Embed]] = None
     ) -> None:
-        await channel.send(
-            content=message,
-            embed=embed,
-            flags=MessageFlags(suppress_notifications=True)
-        )
+        if embeds:
+            await channel.send(
+                content=message,
+                embeds=embeds,
+                flags=MessageFlags(suppress_notifications=True)
+            )
+        else:
+            await channel.send(
+                content=message,
+                embed=embed,
+                flags=MessageFlags(suppress_notifications=True)
+            )
 
     @staticmethod
     async def send_error_response(interaction) -> None:
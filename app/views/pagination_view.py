@@ -1,7 +1,11 @@
+from dataclasses import replace
 from typing import Optional
 
 from disnake import ui, ButtonStyle
 
+from app.core.schemas import PaginationState
+from app.utils.pagination_utils import pagination_utils
+
 
 class PaginationView(ui.View):
     def __init__(
@@ -12,40 +16,54 @@ class PaginationView(ui.View):
             disable_previous: bool = False,
             disable_next: bool = False,
             disable_last: bool = False,
-            target_user_id: Optional[int] = None
+            target_user_id: Optional[int] = None,
+            previous_cursor: Optional[str] = None,
+            next_cursor: Optional[str] = None,
+            total_count: Optional[int] = None
     ):
         super().__init__(timeout=None)
 
         if all([disable_first, disable_previous, disable_next, disable_last]):
             return
 
+        state = PaginationState(
+            criteria=criteria,
+            page=current_page,
+            total_count=total_count,
+            target_user_id=target_user_id,
+        )
+
         self.add_item(ui.Button(
             style=ButtonStyle.grey,
             label="⏪",
-            custom_id=f"first_page_{criteria}_button",
+            custom_id=self._state_id(state, "first"),
             disabled=disable_first,
         ))
         self.add_item(ui.Button(
             style=ButtonStyle.grey,
             label="❮",
-            custom_id=f"previous_page_{criteria}_button",
+            custom_id=self._state_id(state, "previous", previous_cursor),
             disabled=disable_previous,
         ))
         self.add_item(ui.Button(
             style=ButtonStyle.grey,
             label=str(current_page),
-            custom_id=f"current_page_{criteria}_button" if not target_user_id else str(target_user_id),
+            custom_id=self._state_id(state, "current"),
             disabled=True,
         ))
         self.add_item(ui.Button(
             style=ButtonStyle.grey,
             label="❯",
-            custom_id=f"next_page_{criteria}_button",
+            custom_id=self._state_id(state, "next", next_cursor),
             disabled=disable_next,
         ))
         self.add_item(ui.Button(
             style=ButtonStyle.grey,
             label="⏩",
-            custom_id=f"last_page_{criteria}_button",
+            custom_id=self._state_id(state, "last"),
             disabled=disable_last,
         ))
+
+    @staticmethod
+    def _state_id(state: PaginationState, action: str, cursor: Optional[str] = None) -> str:
+        return pagination_utils.encode_state(replace(state, action=action, cursor=cursor))